@@ -0,0 +1,28 @@
+from aiogram import F, Router
+from aiogram.types import CallbackQuery
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.bot.keyboards.inline import get_phone_copy_keyboard
+from app.services.phone_reveal import PhoneRevealer
+
+router = Router()
+
+
+@router.callback_query(F.data.startswith("kufar_phone_"))
+async def handle_show_kufar_phone(callback: CallbackQuery, session: AsyncSession):
+    ad_id = callback.data.split("_")[2]
+    phone = await PhoneRevealer.get_kufar_phone(session, ad_id)
+
+    if not phone:
+        await callback.answer(
+            "Не удалось получить номер телефона. Попробуйте позже.", show_alert=True
+        )
+        return
+
+    try:
+        await callback.message.edit_reply_markup(
+            reply_markup=get_phone_copy_keyboard(phone)
+        )
+    except Exception:
+        pass
+    await callback.answer(f"Телефон: {phone}", show_alert=True)
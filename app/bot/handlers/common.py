@@ -6,23 +6,24 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.bot.handlers.analyse_handler import URL_PATTERN, process_analysis_request
 from app.bot.keyboards.inline import (
+    SUBSCRIPTIONS_PAGE_SIZE,
     get_ai_settings_keyboard,
-    get_back_to_subscriptions_keyboard,
     get_main_menu_keyboard,
+    get_subscription_details_keyboard,
     get_subscriptions_keyboard,
 )
 from app.bot.keyboards.reply import get_menu_keyboard
 from app.core.db_queries import (
+    count_user_subscriptions,
     delete_subscription_by_id,
-    get_or_create_user,
     get_subscription_by_id,
-    get_user,
-    get_user_subscriptions,
-    toggle_ai_analysis,
+    get_user_subscriptions_page,
+    set_subscription_delivery_mode,
 )
 from app.core.settings import settings
 from app.services.filters_metadata import KUFAR_FILTERS
 from app.services.unified_filters_metadata import UNIFIED_FILTERS
+from app.services.user_cache import UserCache
 
 router = Router()
 
@@ -30,12 +31,7 @@ router = Router()
 @router.message(CommandStart())
 async def handle_start(message: Message, state: FSMContext, session: AsyncSession):
     await state.clear()
-    await get_or_create_user(
-        session,
-        user_id=message.from_user.id,
-        username=message.from_user.username,
-        first_name=message.from_user.first_name,
-    )
+    await UserCache.ensure_user(session, message.from_user)
     await message.answer(
         "Привет! Я бот для отслеживания объявлений.",
         reply_markup=get_menu_keyboard(),
@@ -50,21 +46,47 @@ async def handle_menu(message: Message, state: FSMContext):
     await message.answer("Главное меню:", reply_markup=get_main_menu_keyboard())
 
 
+async def build_subscriptions_keyboard(
+    session: AsyncSession,
+    user_id: int,
+    page: int = 0,
+    after_id: int | None = None,
+    before_id: int | None = None,
+):
+    items = await get_user_subscriptions_page(
+        session,
+        user_id,
+        SUBSCRIPTIONS_PAGE_SIZE,
+        after_id=after_id,
+        before_id=before_id,
+    )
+    total = await count_user_subscriptions(session, user_id)
+    return get_subscriptions_keyboard(items, page=page, total=total)
+
+
 @router.callback_query(F.data == "my_subscriptions")
 async def handle_my_subscriptions(callback: CallbackQuery, session: AsyncSession):
-    subscriptions = await get_user_subscriptions(session, callback.from_user.id)
-    await callback.message.edit_text(
-        "Ваши подписки:", reply_markup=get_subscriptions_keyboard(subscriptions, page=0)
-    )
+    markup = await build_subscriptions_keyboard(session, callback.from_user.id)
+    await callback.message.edit_text("Ваши подписки:", reply_markup=markup)
 
 
 @router.callback_query(F.data.startswith("my_subscriptions_page_"))
 async def handle_subscriptions_pagination(
     callback: CallbackQuery, session: AsyncSession
 ):
-    page = int(callback.data.split("_")[-1])
-    subscriptions = await get_user_subscriptions(session, callback.from_user.id)
-    markup = get_subscriptions_keyboard(subscriptions, page=page)
+    parts = callback.data.split("_")
+    if len(parts) == 6:
+        page, direction, cursor_id = parts[3:]
+        cursor = {direction: int(cursor_id)}
+        markup = await build_subscriptions_keyboard(
+            session,
+            callback.from_user.id,
+            page=int(page),
+            after_id=cursor.get("after"),
+            before_id=cursor.get("before"),
+        )
+    else:
+        markup = await build_subscriptions_keyboard(session, callback.from_user.id)
     await callback.message.edit_reply_markup(reply_markup=markup)
     await callback.answer()
 
@@ -146,9 +168,37 @@ async def handle_view_subscription(callback: CallbackQuery, session: AsyncSessio
         details.append("\n<i>Дополнительные фильтры не заданы.</i>")
 
     await callback.message.edit_text(
-        "\n".join(details), reply_markup=get_back_to_subscriptions_keyboard()
+        "\n".join(details),
+        reply_markup=get_subscription_details_keyboard(sub.id, sub.delivery_mode),
+    )
+
+
+@router.callback_query(F.data.startswith("sub_mode_"))
+async def handle_toggle_delivery_mode(callback: CallbackQuery, session: AsyncSession):
+    sub_id = int(callback.data.split("_")[2])
+    sub = await get_subscription_by_id(session, sub_id, callback.from_user.id)
+
+    if not sub:
+        await callback.answer("Подписка не найдена.", show_alert=True)
+        return
+
+    modes = ["auto", "digest", "single"]
+    current_index = modes.index(sub.delivery_mode) if sub.delivery_mode in modes else 0
+    new_mode = modes[(current_index + 1) % len(modes)]
+    await set_subscription_delivery_mode(
+        session, sub_id, callback.from_user.id, new_mode
     )
 
+    mode_hints = {
+        "auto": f"Авто: подборка при {settings.digest_threshold}+ объявлениях за раз.",
+        "digest": "Подборкой: объявления собираются и приходят одним сообщением.",
+        "single": "По одному: каждое объявление приходит отдельным сообщением.",
+    }
+    await callback.message.edit_reply_markup(
+        reply_markup=get_subscription_details_keyboard(sub_id, new_mode)
+    )
+    await callback.answer(mode_hints[new_mode], show_alert=True)
+
 
 @router.callback_query(F.data.startswith("delete_sub_"))
 async def handle_delete_subscription(callback: CallbackQuery, session: AsyncSession):
@@ -156,10 +206,8 @@ async def handle_delete_subscription(callback: CallbackQuery, session: AsyncSess
     deleted = await delete_subscription_by_id(session, sub_id, callback.from_user.id)
     if deleted:
         await callback.answer("Подписка удалена!", show_alert=True)
-        subscriptions = await get_user_subscriptions(session, callback.from_user.id)
-        await callback.message.edit_text(
-            "Ваши подписки:", reply_markup=get_subscriptions_keyboard(subscriptions)
-        )
+        markup = await build_subscriptions_keyboard(session, callback.from_user.id)
+        await callback.message.edit_text("Ваши подписки:", reply_markup=markup)
     else:
         await callback.answer("Не удалось удалить подписку.", show_alert=True)
 
@@ -174,20 +222,14 @@ async def handle_back_to_main(callback: CallbackQuery, state: FSMContext):
 
 @router.callback_query(F.data == "ai_settings")
 async def handle_ai_settings(callback: CallbackQuery, session: AsyncSession):
-    await get_or_create_user(
-        session,
-        user_id=callback.from_user.id,
-        username=callback.from_user.username,
-        first_name=callback.from_user.first_name,
-    )
-    user = await get_user(session, callback.from_user.id)
+    ai_enabled = await UserCache.get_ai_enabled(session, callback.from_user)
     text = (
         "Здесь вы можете включить автоматический анализ каждого объявления, "
         "которое приходит по вашим подпискам. Бот будет отвечать на сообщение с "
         "объявлением, присылая краткую сводку об автомобиле от ИИ."
     )
     await callback.message.edit_text(
-        text, reply_markup=get_ai_settings_keyboard(user.ai_analysis_enabled)
+        text, reply_markup=get_ai_settings_keyboard(ai_enabled)
     )
 
 
@@ -199,14 +241,7 @@ async def handle_ai_toggle(callback: CallbackQuery, session: AsyncSession):
         )
         return
 
-    await get_or_create_user(
-        session,
-        user_id=callback.from_user.id,
-        username=callback.from_user.username,
-        first_name=callback.from_user.first_name,
-    )
-
-    new_status = await toggle_ai_analysis(session, callback.from_user.id)
+    new_status = await UserCache.toggle_ai_enabled(session, callback.from_user)
     await callback.message.edit_reply_markup(
         reply_markup=get_ai_settings_keyboard(new_status)
     )
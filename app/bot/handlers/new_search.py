@@ -3,8 +3,8 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.bot.keyboards.catalog import get_brands_keyboard, get_models_keyboard
 from app.bot.keyboards.inline import (
-    create_paginated_keyboard,
     get_filter_options_keyboard,
     get_main_menu_keyboard,
     get_platform_keyboard,
@@ -37,8 +37,8 @@ async def ask_for_brand(callback: CallbackQuery, state: FSMContext):
     await state.set_state(SearchState.brand)
     data = await state.get_data()
     total_steps = 5
-    brands = await get_brands(data["platform"])
-    if not brands:
+    markup = await get_brands_keyboard(data["platform"])
+    if not markup:
         await callback.message.edit_text(
             "Не удалось загрузить список марок. Попробуйте позже.",
             reply_markup=get_main_menu_keyboard(),
@@ -47,13 +47,7 @@ async def ask_for_brand(callback: CallbackQuery, state: FSMContext):
         return
     await callback.message.edit_text(
         f"{build_summary_text(data)}\n<b>Шаг 2/{total_steps}:</b> Выберите марку автомобиля:",
-        reply_markup=create_paginated_keyboard(
-            items=brands,
-            action_prefix="brand_select",
-            page_prefix="brand_page",
-            add_any_button=True,
-            back_callback="back_to_platform",
-        ),
+        reply_markup=markup,
     )
 
 
@@ -69,8 +63,8 @@ async def ask_for_model(callback: CallbackQuery, state: FSMContext):
         await ask_for_price(callback, state)
         return
 
-    models = await get_models_for_brand(data["platform"], brand_id, brand_slug)
-    if not models:
+    markup = await get_models_keyboard(data["platform"], brand_id, brand_slug)
+    if not markup:
         await state.update_data(model_id=None, model_name=None, model_slug=None)
         await callback.answer(
             "Для этой марки не найдено моделей, пропускаем шаг.", show_alert=True
@@ -80,13 +74,7 @@ async def ask_for_model(callback: CallbackQuery, state: FSMContext):
 
     await callback.message.edit_text(
         f"{build_summary_text(data)}\n<b>Шаг 3/{total_steps}:</b> Выберите модель:",
-        reply_markup=create_paginated_keyboard(
-            items=models,
-            action_prefix="model_select",
-            page_prefix="model_page",
-            add_any_button=True,
-            back_callback="back_to_brand",
-        ),
+        reply_markup=markup,
     )
 
 
@@ -164,16 +152,8 @@ async def handle_platform_selection(callback: CallbackQuery, state: FSMContext):
 async def handle_brand_pagination(callback: CallbackQuery, state: FSMContext):
     page = int(callback.data.split("_")[2])
     data = await state.get_data()
-    brands = await get_brands(data["platform"])
     await callback.message.edit_reply_markup(
-        reply_markup=create_paginated_keyboard(
-            items=brands,
-            page=page,
-            action_prefix="brand_select",
-            page_prefix="brand_page",
-            add_any_button=True,
-            back_callback="back_to_platform",
-        )
+        reply_markup=await get_brands_keyboard(data["platform"], page)
     )
 
 
@@ -206,17 +186,9 @@ async def handle_back_to_brand(callback: CallbackQuery, state: FSMContext):
 async def handle_model_pagination(callback: CallbackQuery, state: FSMContext):
     page = int(callback.data.split("_")[2])
     data = await state.get_data()
-    models = await get_models_for_brand(
-        data["platform"], data["brand_id"], data["brand_slug"]
-    )
     await callback.message.edit_reply_markup(
-        reply_markup=create_paginated_keyboard(
-            items=models,
-            page=page,
-            action_prefix="model_select",
-            page_prefix="model_page",
-            add_any_button=True,
-            back_callback="back_to_brand",
+        reply_markup=await get_models_keyboard(
+            data["platform"], data["brand_id"], data["brand_slug"], page
         )
     )
 
@@ -0,0 +1,80 @@
+from aiogram.types import InlineKeyboardMarkup
+
+from app.bot.keyboards.inline import create_paginated_keyboard
+from app.services.catalog import BrandCatalog
+from app.services.data_fetcher import get_brands, get_models_for_brand
+
+
+class CatalogKeyboardCache:
+    _version: int | None = None
+    _markups: dict[tuple, InlineKeyboardMarkup] = {}
+
+    @staticmethod
+    def make_key(platform: str, brand_id: int | None, page: int) -> tuple:
+        return (BrandCatalog.version(), platform, brand_id, page)
+
+    @classmethod
+    def get(cls, key: tuple) -> InlineKeyboardMarkup | None:
+        return cls._markups.get(key)
+
+    @classmethod
+    def put(cls, key: tuple, markup: InlineKeyboardMarkup):
+        version = key[0]
+        if version != BrandCatalog.version():
+            return
+        if version != cls._version:
+            cls._markups = {}
+            cls._version = version
+        cls._markups[key] = markup
+
+
+async def get_brands_keyboard(
+    platform: str, page: int = 0
+) -> InlineKeyboardMarkup | None:
+    markup = CatalogKeyboardCache.get(
+        CatalogKeyboardCache.make_key(platform, None, page)
+    )
+    if markup:
+        return markup
+
+    brands = await get_brands(platform)
+    if not brands:
+        return None
+    markup = create_paginated_keyboard(
+        items=brands,
+        page=page,
+        action_prefix="brand_select",
+        page_prefix="brand_page",
+        add_any_button=True,
+        back_callback="back_to_platform",
+    )
+    CatalogKeyboardCache.put(
+        CatalogKeyboardCache.make_key(platform, None, page), markup
+    )
+    return markup
+
+
+async def get_models_keyboard(
+    platform: str, brand_id: int, brand_slug: str | None, page: int = 0
+) -> InlineKeyboardMarkup | None:
+    markup = CatalogKeyboardCache.get(
+        CatalogKeyboardCache.make_key(platform, brand_id, page)
+    )
+    if markup:
+        return markup
+
+    models = await get_models_for_brand(platform, brand_id, brand_slug)
+    if not models:
+        return None
+    markup = create_paginated_keyboard(
+        items=models,
+        page=page,
+        action_prefix="model_select",
+        page_prefix="model_page",
+        add_any_button=True,
+        back_callback="back_to_brand",
+    )
+    CatalogKeyboardCache.put(
+        CatalogKeyboardCache.make_key(platform, brand_id, page), markup
+    )
+    return markup
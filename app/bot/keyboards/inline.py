@@ -1,8 +1,6 @@
-from aiogram.types import InlineKeyboardButton
+from aiogram.types import CopyTextButton, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from app.core.models import Subscription
-
 
 def get_main_menu_keyboard():
     builder = InlineKeyboardBuilder()
@@ -158,6 +156,9 @@ def get_filter_options_keyboard(options: list, selected_ids: list, filter_key: s
     return builder.as_markup()
 
 
+SUBSCRIPTIONS_PAGE_SIZE = 5
+
+
 def format_params_for_display(platform: str, params: dict) -> str:
     brand = params.get("brand_name", "Любая")
     model = params.get("model_name", "Любая")
@@ -172,38 +173,44 @@ def format_params_for_display(platform: str, params: dict) -> str:
     return f"{platform.upper()}: {full_name}, до ${price}"
 
 
-def get_subscriptions_keyboard(
-    subscriptions: list[Subscription], page: int = 0, page_size: int = 5
-):
+def get_subscriptions_keyboard(items: list, page: int, total: int):
     builder = InlineKeyboardBuilder()
 
-    start_offset = page * page_size
-    end_offset = start_offset + page_size
-
-    for sub in subscriptions[start_offset:end_offset]:
-        text = format_params_for_display(sub.search.platform, sub.search.search_params)
+    for item in items:
+        params = {
+            key: value
+            for key, value in (
+                ("brand_name", item.brand_name),
+                ("model_name", item.model_name),
+                ("price_usd[max]", item.max_price),
+            )
+            if value is not None
+        }
+        text = format_params_for_display(item.platform, params)
         builder.row(
-            InlineKeyboardButton(text=text, callback_data=f"view_sub_{sub.id}"),
-            InlineKeyboardButton(text="❌", callback_data=f"delete_sub_{sub.id}"),
+            InlineKeyboardButton(text=text, callback_data=f"view_sub_{item.id}"),
+            InlineKeyboardButton(text="❌", callback_data=f"delete_sub_{item.id}"),
         )
 
     nav_buttons = []
-    total_pages = (len(subscriptions) + page_size - 1) // page_size
+    total_pages = (total + SUBSCRIPTIONS_PAGE_SIZE - 1) // SUBSCRIPTIONS_PAGE_SIZE
 
-    if page > 0:
+    if page > 0 and items:
         nav_buttons.append(
             InlineKeyboardButton(
-                text="<<", callback_data=f"my_subscriptions_page_{page - 1}"
+                text="<<",
+                callback_data=f"my_subscriptions_page_{page - 1}_before_{items[0].id}",
             )
         )
     if total_pages > 1:
         nav_buttons.append(
             InlineKeyboardButton(text=f"{page + 1}/{total_pages}", callback_data="noop")
         )
-    if end_offset < len(subscriptions):
+    if (page + 1) * SUBSCRIPTIONS_PAGE_SIZE < total and items:
         nav_buttons.append(
             InlineKeyboardButton(
-                text=">>", callback_data=f"my_subscriptions_page_{page + 1}"
+                text=">>",
+                callback_data=f"my_subscriptions_page_{page + 1}_after_{items[-1].id}",
             )
         )
 
@@ -224,3 +231,45 @@ def get_back_to_subscriptions_keyboard():
         )
     )
     return builder.as_markup()
+
+
+DELIVERY_MODE_LABELS = {
+    "auto": "🔄 Авто",
+    "single": "📨 По одному",
+    "digest": "📦 Подборкой",
+}
+
+
+def get_subscription_details_keyboard(subscription_id: int, delivery_mode: str):
+    builder = InlineKeyboardBuilder()
+    mode_label = DELIVERY_MODE_LABELS.get(delivery_mode, DELIVERY_MODE_LABELS["auto"])
+    builder.row(
+        InlineKeyboardButton(
+            text=f"Доставка: {mode_label}",
+            callback_data=f"sub_mode_{subscription_id}",
+        )
+    )
+    builder.row(
+        InlineKeyboardButton(
+            text="⬅️ Назад к подпискам", callback_data="my_subscriptions"
+        )
+    )
+    return builder.as_markup()
+
+
+def get_phone_reveal_keyboard(ad_id: str):
+    builder = InlineKeyboardBuilder()
+    builder.row(
+        InlineKeyboardButton(
+            text="📞 Показать телефон", callback_data=f"kufar_phone_{ad_id}"
+        )
+    )
+    return builder.as_markup()
+
+
+def get_phone_copy_keyboard(phone: str):
+    builder = InlineKeyboardBuilder()
+    builder.row(
+        InlineKeyboardButton(text=f"📞 {phone}", copy_text=CopyTextButton(text=phone))
+    )
+    return builder.as_markup()
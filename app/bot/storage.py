@@ -0,0 +1,195 @@
+import asyncio
+import datetime
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Mapping
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.database import wait_for_schema
+from app.core.db_queries import (
+    delete_expired_fsm_states,
+    get_fsm_state,
+    save_fsm_states,
+)
+from app.core.settings import settings
+
+
+@dataclass
+class FsmRecord:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+
+class DbStorage(BaseStorage):
+    def __init__(self, session_maker: async_sessionmaker):
+        self.session_maker = session_maker
+        self._records: OrderedDict[str, FsmRecord] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._flushing: set[str] = set()
+        self._flusher: asyncio.Task | None = None
+        self._last_cleanup_at = 0.0
+
+    @staticmethod
+    def _make_key(key: StorageKey) -> str:
+        parts = (
+            key.bot_id,
+            key.chat_id,
+            key.user_id,
+            key.thread_id or "",
+            key.business_connection_id or "",
+            key.destiny,
+        )
+        return ":".join(str(part) for part in parts)
+
+    def _remember(self, record_key: str, record: FsmRecord):
+        self._records[record_key] = record
+        self._records.move_to_end(record_key)
+        for stale_key in list(self._records):
+            if len(self._records) <= settings.fsm_cache_size:
+                break
+            if not self._is_pending(stale_key):
+                del self._records[stale_key]
+
+    def _is_pending(self, record_key: str) -> bool:
+        return record_key in self._dirty or record_key in self._flushing
+
+    async def _get_record(self, key: StorageKey) -> tuple[str, FsmRecord]:
+        record_key = self._make_key(key)
+        record = self._records.get(record_key)
+        if record and (
+            self._is_pending(record_key)
+            or time.monotonic() - record.loaded_at < settings.fsm_cache_ttl_seconds
+        ):
+            self._records.move_to_end(record_key)
+            return record_key, record
+
+        await wait_for_schema()
+        async with self.session_maker() as session:
+            row = await get_fsm_state(session, record_key)
+
+        record = self._records.get(record_key)
+        if record and self._is_pending(record_key):
+            return record_key, record
+
+        record = FsmRecord(
+            state=row.state if row else None,
+            data=json.loads(row.data) if row and row.data else {},
+            loaded_at=time.monotonic(),
+        )
+        self._remember(record_key, record)
+        return record_key, record
+
+    def _mark_dirty(self, record_key: str, record: FsmRecord):
+        record.loaded_at = time.monotonic()
+        self._dirty.add(record_key)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run_flusher())
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record_key, record = await self._get_record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(record_key, record)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        _, record = await self._get_record(key)
+        return record.state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            )
+        record_key, record = await self._get_record(key)
+        record.data = data.copy()
+        self._mark_dirty(record_key, record)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, record = await self._get_record(key)
+        return record.data.copy()
+
+    async def flush(self):
+        if not self._dirty:
+            return
+
+        keys, self._dirty = self._dirty, set()
+        self._flushing |= keys
+        expires_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
+            seconds=settings.fsm_state_ttl_seconds
+        )
+        rows = []
+        cleared_keys = []
+        for record_key in keys:
+            record = self._records.get(record_key)
+            if record is None:
+                continue
+            if record.state is None and not record.data:
+                cleared_keys.append(record_key)
+                continue
+            rows.append(
+                {
+                    "key": record_key,
+                    "state": record.state,
+                    "data": json.dumps(
+                        record.data, ensure_ascii=False, separators=(",", ":")
+                    ),
+                    "expires_at": expires_at,
+                }
+            )
+
+        try:
+            await wait_for_schema()
+            async with self.session_maker() as session:
+                await save_fsm_states(session, rows, cleared_keys)
+        except Exception as e:
+            self._dirty |= keys
+            logging.error(
+                f"FSM_STORAGE: Failed to flush {len(keys)} states. Error: {e}"
+            )
+            return
+        finally:
+            self._flushing -= keys
+
+        flushed_at = time.monotonic()
+        for record_key in keys:
+            record = self._records.get(record_key)
+            if record:
+                record.loaded_at = flushed_at
+
+    async def cleanup(self):
+        try:
+            await wait_for_schema()
+            async with self.session_maker() as session:
+                deleted = await delete_expired_fsm_states(session)
+        except Exception as e:
+            logging.error(f"FSM_STORAGE: Failed to delete expired states. Error: {e}")
+            return
+        if deleted:
+            logging.info(f"FSM_STORAGE: Deleted {deleted} expired states.")
+
+    async def _run_flusher(self):
+        while self._dirty:
+            await asyncio.sleep(settings.fsm_flush_interval_seconds)
+            await self.flush()
+            if (
+                time.monotonic() - self._last_cleanup_at
+                >= settings.fsm_cleanup_interval_seconds
+            ):
+                self._last_cleanup_at = time.monotonic()
+                await self.cleanup()
+
+    async def close(self) -> None:
+        if self._flusher and not self._flusher.done():
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
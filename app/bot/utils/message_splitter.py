@@ -9,6 +9,7 @@ async def send_long_message(
     text: str,
     parse_mode: str | None = None,
     reply_to_message_id: int | None = None,
+    disable_web_page_preview: bool | None = None,
 ):
     max_length = 4096
     if len(text) <= max_length:
@@ -17,6 +18,7 @@ async def send_long_message(
             text,
             parse_mode=parse_mode,
             reply_to_message_id=reply_to_message_id,
+            disable_web_page_preview=disable_web_page_preview,
         )
         return
 
@@ -47,7 +49,13 @@ async def send_long_message(
                 part,
                 parse_mode=parse_mode,
                 reply_to_message_id=reply_to_message_id,
+                disable_web_page_preview=disable_web_page_preview,
             )
         else:
-            await bot.send_message(chat_id, part, parse_mode=parse_mode)
+            await bot.send_message(
+                chat_id,
+                part,
+                parse_mode=parse_mode,
+                disable_web_page_preview=disable_web_page_preview,
+            )
         await asyncio.sleep(0.5)
@@ -0,0 +1,53 @@
+import asyncio
+import hashlib
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from app.core.settings import settings
+
+
+def get_webhook_secret() -> str:
+    if settings.webhook_secret:
+        return settings.webhook_secret
+    return hashlib.sha256(settings.bot_token.encode()).hexdigest()
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    if not settings.webhook_base_url:
+        raise ValueError("WEBHOOK_BASE_URL must be set when BOT_MODE is 'webhook'.")
+
+    secret_token = get_webhook_secret()
+    webhook_url = settings.webhook_base_url.rstrip("/") + settings.webhook_path
+
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=True,
+        secret_token=secret_token,
+    ).register(app, path=settings.webhook_path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.webhook_host, settings.webhook_port)
+    await site.start()
+
+    await bot.set_webhook(
+        webhook_url,
+        secret_token=secret_token,
+        allowed_updates=dp.resolve_used_update_types(),
+        max_connections=settings.webhook_max_connections,
+    )
+    logging.info(
+        f"WEBHOOK: Listening on {settings.webhook_host}:{settings.webhook_port}{settings.webhook_path}, "
+        f"registered {webhook_url}."
+    )
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
@@ -1,2 +1,119 @@
-def get_db_url(db_name: str = "db.sqlite3"):
-    return f"sqlite+aiosqlite:///{db_name}"
+import asyncio
+
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.schema import CreateColumn
+
+from app.core.models import Base
+from app.core.settings import settings
+
+INSERT_CONSTRUCTS = {
+    "sqlite": sqlite_insert,
+    "postgresql": postgresql_insert,
+}
+
+ADDED_COLUMNS = {
+    "subscriptions": ["delivery_mode"],
+    "unique_searches": [
+        "lease_owner",
+        "lease_expires_at",
+        "catchup_from",
+        "catchup_until",
+        "catchup_cursor",
+        "catchup_pages",
+    ],
+    "outbox": ["priority"],
+}
+
+_schema_task: asyncio.Task | None = None
+
+
+def get_db_url() -> str:
+    return settings.database_url
+
+
+def create_db_engine(url: str | None = None) -> AsyncEngine:
+    url = url or get_db_url()
+    if url.startswith("sqlite"):
+        return create_async_engine(
+            url,
+            echo=False,
+            connect_args={"timeout": settings.database_busy_timeout_seconds},
+        )
+    return create_async_engine(
+        url,
+        echo=False,
+        pool_size=settings.database_pool_size,
+        pool_pre_ping=True,
+    )
+
+
+def add_missing_columns(conn):
+    inspector = inspect(conn)
+    for table_name, column_names in ADDED_COLUMNS.items():
+        table = Base.metadata.tables[table_name]
+        existing = {column["name"] for column in inspector.get_columns(table_name)}
+        for column_name in column_names:
+            if column_name in existing:
+                continue
+            column_ddl = CreateColumn(table.c[column_name]).compile(
+                dialect=conn.dialect
+            )
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_ddl}"))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+async def create_schema(engine: AsyncEngine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
+
+
+def start_schema_init(engine: AsyncEngine) -> asyncio.Task:
+    global _schema_task
+    _schema_task = asyncio.create_task(create_schema(engine))
+    return _schema_task
+
+
+async def wait_for_schema():
+    if _schema_task is not None:
+        await asyncio.shield(_schema_task)
+
+
+def get_insert(session: AsyncSession):
+    dialect = session.bind.dialect.name
+    insert = INSERT_CONSTRUCTS.get(dialect)
+    if insert is None:
+        raise NotImplementedError(f"Unsupported database dialect: {dialect}")
+    return insert
+
+
+def insert_ignore(
+    session: AsyncSession,
+    model,
+    values,
+    index_elements: list[str] | None = None,
+):
+    insert = get_insert(session)
+    return (
+        insert(model)
+        .values(values)
+        .on_conflict_do_nothing(index_elements=index_elements)
+    )
+
+
+def upsert(
+    session: AsyncSession,
+    model,
+    values,
+    index_elements: list[str],
+    update_columns: list[str],
+):
+    stmt = get_insert(session)(model).values(values)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: stmt.excluded[column] for column in update_columns},
+    )
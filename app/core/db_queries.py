@@ -1,22 +1,35 @@
 import datetime
+import logging
 
-from sqlalchemy import delete, select, update
+from sqlalchemy import case, delete, select, update
 from sqlalchemy import func as sql_func
-from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.core.models import Ad, SentAd, Subscription, UniqueSearch, User
+from app.core.database import insert_ignore, upsert
+from app.core.models import (
+    Ad,
+    CatalogSnapshot,
+    FsmState,
+    OutboxMessage,
+    SentAd,
+    Subscription,
+    UniqueSearch,
+    User,
+)
+from app.core.settings import settings
 from app.utils.hash import get_search_hash
 
 
 async def get_or_create_user(
     session: AsyncSession, user_id: int, username: str | None, first_name: str | None
 ):
-    stmt = insert(User).values(
-        user_id=user_id, username=username, first_name=first_name
+    stmt = insert_ignore(
+        session,
+        User,
+        {"user_id": user_id, "username": username, "first_name": first_name},
+        index_elements=["user_id"],
     )
-    stmt = stmt.on_conflict_do_nothing(index_elements=["user_id"])
     await session.execute(stmt)
     await session.commit()
 
@@ -41,30 +54,94 @@ async def create_subscription(
 ):
     search_hash = get_search_hash(platform, params)
 
-    search_stmt = insert(UniqueSearch).values(
-        search_hash=search_hash, platform=platform, search_params=params
+    search_stmt = insert_ignore(
+        session,
+        UniqueSearch,
+        {"search_hash": search_hash, "platform": platform, "search_params": params},
     )
-    await session.execute(search_stmt.on_conflict_do_nothing())
+    await session.execute(search_stmt)
 
-    sub_stmt = insert(Subscription).values(
-        user_id=user_id, search_hash=search_hash, is_active=True
+    sub_stmt = insert_ignore(
+        session,
+        Subscription,
+        {"user_id": user_id, "search_hash": search_hash, "is_active": True},
     )
-    await session.execute(sub_stmt.on_conflict_do_nothing())
+    await session.execute(sub_stmt)
     await session.commit()
 
 
-async def get_active_searches(session: AsyncSession):
-    stmt = (
-        select(UniqueSearch)
+async def claim_searches(
+    session: AsyncSession, owner: str, limit: int, lease_seconds: int
+) -> list[UniqueSearch]:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    due_before = now - datetime.timedelta(seconds=settings.search_recheck_seconds)
+    claimable = (
+        (UniqueSearch.lease_owner == owner)
+        | UniqueSearch.lease_expires_at.is_(None)
+        | (UniqueSearch.lease_expires_at < now)
+    )
+
+    candidates_stmt = (
+        select(UniqueSearch.search_hash, UniqueSearch.lease_owner)
         .join(Subscription, UniqueSearch.search_hash == Subscription.search_hash)
-        .where(Subscription.is_active)
+        .where(Subscription.is_active, claimable)
+        .where(
+            UniqueSearch.last_checked_at.is_(None)
+            | (UniqueSearch.last_checked_at < due_before)
+            | (UniqueSearch.lease_owner == owner)
+        )
         .group_by(UniqueSearch.search_hash)
-        .having(sql_func.count(Subscription.id) > 0)
+        .order_by(UniqueSearch.last_checked_at.asc().nulls_first())
+        .limit(limit)
     )
-    result = await session.execute(stmt)
+    candidates = (await session.execute(candidates_stmt)).all()
+    if not candidates:
+        return []
+
+    hashes = [row.search_hash for row in candidates]
+    expires_at = now + datetime.timedelta(seconds=lease_seconds)
+    claim_stmt = (
+        update(UniqueSearch)
+        .where(UniqueSearch.search_hash.in_(hashes), claimable)
+        .values(lease_owner=owner, lease_expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    await session.execute(claim_stmt)
+    await session.commit()
+
+    taken_over = sum(1 for row in candidates if row.lease_owner not in (None, owner))
+    if taken_over:
+        logging.warning(f"DB: {owner} took over {taken_over} expired search leases.")
+
+    claimed_stmt = (
+        select(UniqueSearch)
+        .where(
+            UniqueSearch.search_hash.in_(hashes),
+            UniqueSearch.lease_owner == owner,
+        )
+        .order_by(UniqueSearch.last_checked_at.asc().nulls_first())
+    )
+    result = await session.execute(claimed_stmt)
     return result.scalars().all()
 
 
+async def release_search_leases(
+    session: AsyncSession, owner: str, search_hashes: list[str] | None = None
+):
+    stmt = (
+        update(UniqueSearch)
+        .where(UniqueSearch.lease_owner == owner)
+        .values(lease_owner=None, lease_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    if search_hashes is not None:
+        if not search_hashes:
+            return
+        stmt = stmt.where(UniqueSearch.search_hash.in_(search_hashes))
+    await session.execute(stmt)
+    await session.commit()
+
+
 async def update_search_last_checked(session: AsyncSession, search_hash: str):
     stmt = (
         update(UniqueSearch)
@@ -75,43 +152,177 @@ async def update_search_last_checked(session: AsyncSession, search_hash: str):
     await session.commit()
 
 
-async def get_subscriptions_by_search_hash(session: AsyncSession, search_hash: str):
+async def schedule_catch_up(
+    session: AsyncSession, until: datetime.datetime, max_window_seconds: int
+) -> int:
+    window_start = until - datetime.timedelta(seconds=max_window_seconds)
+    stale_before = until - datetime.timedelta(seconds=settings.catch_up_min_gap_seconds)
+    active_search_hashes = select(Subscription.search_hash).where(
+        Subscription.is_active
+    )
     stmt = (
-        select(Subscription)
-        .options(selectinload(Subscription.user))
-        .where(Subscription.search_hash == search_hash, Subscription.is_active)
+        update(UniqueSearch)
+        .where(
+            UniqueSearch.search_hash.in_(active_search_hashes),
+            UniqueSearch.catchup_until.is_(None),
+            UniqueSearch.last_checked_at < stale_before,
+        )
+        .values(
+            catchup_from=case(
+                (
+                    UniqueSearch.last_checked_at > window_start,
+                    UniqueSearch.last_checked_at,
+                ),
+                else_=window_start,
+            ),
+            catchup_until=until,
+            catchup_cursor=None,
+            catchup_pages=0,
+        )
+        .execution_options(synchronize_session=False)
     )
     result = await session.execute(stmt)
-    return result.scalars().all()
+    await session.commit()
+    return result.rowcount
+
 
+async def update_search_catch_up(
+    session: AsyncSession, search_hash: str, cursor: str | None, pages: int, done: bool
+):
+    values = {"catchup_cursor": cursor, "catchup_pages": pages}
+    if done:
+        values.update(catchup_from=None, catchup_until=None, catchup_cursor=None)
+    stmt = (
+        update(UniqueSearch)
+        .where(UniqueSearch.search_hash == search_hash)
+        .values(**values)
+    )
+    await session.execute(stmt)
+    await session.commit()
 
-async def add_new_ads(session: AsyncSession, ads: list[dict]):
+
+async def get_existing_ad_urls(session: AsyncSession, urls: list[str]) -> set[str]:
+    if not urls:
+        return set()
+    stmt = select(Ad.url).where(Ad.url.in_(urls))
+    result = await session.execute(stmt)
+    return {row[0] for row in result}
+
+
+async def add_new_ads(
+    session: AsyncSession, search_hash: str, ads: list[dict], priority: int = 0
+):
     if not ads:
         return []
 
-    existing_urls_stmt = select(Ad.url).where(Ad.url.in_([ad["url"] for ad in ads]))
-    result = await session.execute(existing_urls_stmt)
-    existing_urls = {row[0] for row in result}
-
+    existing_urls = await get_existing_ad_urls(session, [ad["url"] for ad in ads])
     new_ads_to_insert = [ad for ad in ads if ad["url"] not in existing_urls]
 
     if not new_ads_to_insert:
         return []
 
-    stmt = insert(Ad).values(new_ads_to_insert)
-    await session.execute(stmt.on_conflict_do_nothing())
+    stmt = insert_ignore(session, Ad, new_ads_to_insert)
+    await session.execute(stmt)
+
+    subscriptions_stmt = select(Subscription.id, Subscription.delivery_mode).where(
+        Subscription.search_hash == search_hash, Subscription.is_active
+    )
+    result = await session.execute(subscriptions_stmt)
+    subscriptions = result.all()
+
+    if subscriptions:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        digest_due_at = now + datetime.timedelta(seconds=settings.digest_window_seconds)
+        digest_ids = [sub_id for sub_id, mode in subscriptions if mode == "digest"]
+        pending_digests = {}
+        if digest_ids:
+            pending_stmt = (
+                select(
+                    OutboxMessage.subscription_id,
+                    sql_func.min(OutboxMessage.next_attempt_at),
+                )
+                .where(
+                    OutboxMessage.subscription_id.in_(digest_ids),
+                    OutboxMessage.attempts == 0,
+                    OutboxMessage.next_attempt_at > now,
+                )
+                .group_by(OutboxMessage.subscription_id)
+            )
+            pending_digests = dict((await session.execute(pending_stmt)).all())
+        outbox_rows = [
+            {
+                "subscription_id": sub_id,
+                "ad_url": ad["url"],
+                "attempts": 0,
+                "priority": priority,
+                "next_attempt_at": (
+                    pending_digests.get(sub_id, digest_due_at)
+                    if mode == "digest"
+                    else now
+                ),
+                "created_at": now,
+            }
+            for sub_id, mode in subscriptions
+            for ad in new_ads_to_insert
+        ]
+        outbox_stmt = insert_ignore(session, OutboxMessage, outbox_rows)
+        await session.execute(outbox_stmt)
+
     await session.commit()
     return new_ads_to_insert
 
 
-async def get_user_subscriptions(session: AsyncSession, user_id: int):
+async def get_ad_by_ad_id(
+    session: AsyncSession, platform: str, ad_id: str
+) -> Ad | None:
+    stmt = select(Ad).where(Ad.platform == platform, Ad.ad_id == ad_id).limit(1)
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def update_ad_data(session: AsyncSession, url: str, data: dict):
+    stmt = update(Ad).where(Ad.url == url).values(data=data)
+    await session.execute(stmt)
+    await session.commit()
+
+
+async def get_user_subscriptions_page(
+    session: AsyncSession,
+    user_id: int,
+    page_size: int,
+    after_id: int | None = None,
+    before_id: int | None = None,
+):
+    params = UniqueSearch.search_params
     stmt = (
-        select(Subscription)
-        .options(selectinload(Subscription.search))
+        select(
+            Subscription.id,
+            UniqueSearch.platform,
+            params["brand_name"].as_string().label("brand_name"),
+            params["model_name"].as_string().label("model_name"),
+            params["price_usd[max]"].as_string().label("max_price"),
+        )
+        .join(UniqueSearch, Subscription.search_hash == UniqueSearch.search_hash)
         .where(Subscription.user_id == user_id)
+        .limit(page_size)
+    )
+    if before_id is not None:
+        stmt = stmt.where(Subscription.id < before_id).order_by(Subscription.id.desc())
+        result = await session.execute(stmt)
+        return list(reversed(result.all()))
+
+    if after_id is not None:
+        stmt = stmt.where(Subscription.id > after_id)
+    result = await session.execute(stmt.order_by(Subscription.id.asc()))
+    return result.all()
+
+
+async def count_user_subscriptions(session: AsyncSession, user_id: int) -> int:
+    stmt = select(sql_func.count(Subscription.id)).where(
+        Subscription.user_id == user_id
     )
     result = await session.execute(stmt)
-    return result.scalars().all()
+    return result.scalar_one()
 
 
 async def get_subscription_by_id(
@@ -126,9 +337,33 @@ async def get_subscription_by_id(
     return result.scalar_one_or_none()
 
 
+async def set_subscription_delivery_mode(
+    session: AsyncSession, subscription_id: int, user_id: int, delivery_mode: str
+):
+    stmt = (
+        update(Subscription)
+        .where(Subscription.id == subscription_id, Subscription.user_id == user_id)
+        .values(delivery_mode=delivery_mode)
+    )
+    result = await session.execute(stmt)
+    await session.commit()
+    return result.rowcount > 0
+
+
 async def delete_subscription_by_id(
     session: AsyncSession, subscription_id: int, user_id: int
 ):
+    owned_subscription = select(Subscription.id).where(
+        Subscription.id == subscription_id, Subscription.user_id == user_id
+    )
+    await session.execute(
+        delete(SentAd).where(SentAd.subscription_id.in_(owned_subscription))
+    )
+    await session.execute(
+        delete(OutboxMessage).where(
+            OutboxMessage.subscription_id.in_(owned_subscription)
+        )
+    )
     stmt = delete(Subscription).where(
         Subscription.id == subscription_id, Subscription.user_id == user_id
     )
@@ -137,14 +372,121 @@ async def delete_subscription_by_id(
     return result.rowcount > 0
 
 
-async def mark_ads_as_sent(
-    session: AsyncSession, subscription_id: int, ad_urls: list[str]
+async def get_due_outbox_messages(session: AsyncSession, limit: int):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    stmt = (
+        select(OutboxMessage)
+        .options(
+            selectinload(OutboxMessage.ad),
+            selectinload(OutboxMessage.subscription).selectinload(Subscription.user),
+        )
+        .where(OutboxMessage.next_attempt_at <= now)
+        .order_by(
+            OutboxMessage.priority, OutboxMessage.next_attempt_at, OutboxMessage.id
+        )
+        .limit(limit)
+    )
+    result = await session.execute(stmt)
+    return result.scalars().all()
+
+
+async def complete_outbox_messages(
+    session: AsyncSession, delivered: list[tuple[int, str]], message_ids: list[int]
+):
+    if delivered:
+        sent_ads_data = [
+            {"subscription_id": sub_id, "ad_url": url} for sub_id, url in delivered
+        ]
+        stmt = insert_ignore(session, SentAd, sent_ads_data)
+        await session.execute(stmt)
+    if message_ids:
+        await session.execute(
+            delete(OutboxMessage).where(OutboxMessage.id.in_(message_ids))
+        )
+    await session.commit()
+
+
+async def reschedule_outbox_message(
+    session: AsyncSession,
+    message_id: int,
+    attempts: int,
+    next_attempt_at: datetime.datetime,
+    error: str,
 ):
-    if not ad_urls:
-        return
-    sent_ads_data = [
-        {"subscription_id": subscription_id, "ad_url": url} for url in ad_urls
-    ]
-    stmt = insert(SentAd).values(sent_ads_data)
-    await session.execute(stmt.on_conflict_do_nothing())
+    stmt = (
+        update(OutboxMessage)
+        .where(OutboxMessage.id == message_id)
+        .values(attempts=attempts, next_attempt_at=next_attempt_at, last_error=error)
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+
+async def get_sent_ad_pairs(
+    session: AsyncSession, subscription_ids: list[int], ad_urls: list[str]
+) -> set[tuple[int, str]]:
+    if not subscription_ids or not ad_urls:
+        return set()
+    stmt = select(SentAd.subscription_id, SentAd.ad_url).where(
+        SentAd.subscription_id.in_(subscription_ids), SentAd.ad_url.in_(ad_urls)
+    )
+    result = await session.execute(stmt)
+    return {(row[0], row[1]) for row in result}
+
+
+async def get_fsm_state(session: AsyncSession, key: str) -> FsmState | None:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    stmt = select(FsmState).where(FsmState.key == key, FsmState.expires_at > now)
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def save_fsm_states(
+    session: AsyncSession, rows: list[dict], cleared_keys: list[str]
+):
+    if rows:
+        stmt = upsert(
+            session,
+            FsmState,
+            rows,
+            index_elements=["key"],
+            update_columns=["state", "data", "expires_at"],
+        )
+        await session.execute(stmt)
+    if cleared_keys:
+        await session.execute(delete(FsmState).where(FsmState.key.in_(cleared_keys)))
+    await session.commit()
+
+
+async def delete_expired_fsm_states(session: AsyncSession) -> int:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    result = await session.execute(delete(FsmState).where(FsmState.expires_at <= now))
+    await session.commit()
+    return result.rowcount
+
+
+async def get_catalog_snapshot(
+    session: AsyncSession, name: str
+) -> CatalogSnapshot | None:
+    stmt = select(CatalogSnapshot).where(CatalogSnapshot.name == name)
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def save_catalog_snapshot(
+    session: AsyncSession, name: str, version: int, data: str
+):
+    stmt = upsert(
+        session,
+        CatalogSnapshot,
+        {
+            "name": name,
+            "version": version,
+            "data": data,
+            "updated_at": datetime.datetime.now(datetime.timezone.utc),
+        },
+        index_elements=["name"],
+        update_columns=["version", "data", "updated_at"],
+    )
+    await session.execute(stmt)
     await session.commit()
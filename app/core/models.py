@@ -6,7 +6,9 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Integer,
     String,
+    Text,
     UniqueConstraint,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
@@ -39,6 +41,18 @@ class UniqueSearch(Base):
     last_checked_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), nullable=True, server_default=func.now()
     )
+    lease_owner: Mapped[str] = mapped_column(String(64), nullable=True)
+    lease_expires_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True, index=True
+    )
+    catchup_from: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    catchup_until: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    catchup_cursor: Mapped[str] = mapped_column(String, nullable=True)
+    catchup_pages: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     subscriptions: Mapped[list["Subscription"]] = relationship(back_populates="search")
 
 
@@ -48,6 +62,9 @@ class Subscription(Base):
     user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"))
     search_hash: Mapped[str] = mapped_column(ForeignKey("unique_searches.search_hash"))
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    delivery_mode: Mapped[str] = mapped_column(
+        String(10), default="auto", server_default="auto"
+    )
     created_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -75,6 +92,47 @@ class Ad(Base):
 class SentAd(Base):
     __tablename__ = "sent_ads"
     subscription_id: Mapped[int] = mapped_column(
-        ForeignKey("subscriptions.id"), primary_key=True
+        ForeignKey("subscriptions.id", ondelete="CASCADE"), primary_key=True
     )
     ad_url: Mapped[str] = mapped_column(ForeignKey("ads.url"), primary_key=True)
+
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    subscription_id: Mapped[int] = mapped_column(
+        ForeignKey("subscriptions.id", ondelete="CASCADE"), index=True
+    )
+    ad_url: Mapped[str] = mapped_column(ForeignKey("ads.url"))
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    priority: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    next_attempt_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), index=True
+    )
+    last_error: Mapped[str] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    subscription: Mapped["Subscription"] = relationship()
+    ad: Mapped["Ad"] = relationship()
+    __table_args__ = (
+        UniqueConstraint("subscription_id", "ad_url", name="_outbox_sub_ad_uc"),
+    )
+
+
+class FsmState(Base):
+    __tablename__ = "fsm_states"
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[str] = mapped_column(String(255), nullable=True)
+    data: Mapped[str] = mapped_column(Text, nullable=True)
+    expires_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), index=True
+    )
+
+
+class CatalogSnapshot(Base):
+    __tablename__ = "catalog_snapshots"
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=1)
+    data: Mapped[str] = mapped_column(Text)
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True))
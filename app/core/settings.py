@@ -4,9 +4,82 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     bot_token: str
+    bot_mode: str = "polling"
+    webhook_base_url: str | None = None
+    webhook_path: str = "/telegram/webhook"
+    webhook_secret: str | None = None
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_max_connections: int = 40
+    embedded_delivery: bool = True
+    user_cache_size: int = 10000
+    user_cache_ttl_seconds: int = 30
+    fsm_state_ttl_seconds: int = 86400
+    fsm_flush_interval_seconds: float = 0.5
+    fsm_cache_ttl_seconds: float = 2.0
+    fsm_cache_size: int = 10000
+    fsm_cleanup_interval_seconds: int = 3600
+    database_url: str = "sqlite+aiosqlite:///db.sqlite3"
+    database_pool_size: int = 10
+    database_busy_timeout_seconds: int = 30
     scheduler_interval_seconds: int = 60
+    tick_budget_seconds: int = 50
+    embedded_crawler: bool = True
+    crawler_worker_id: str | None = None
+    crawler_batch_size: int = 200
+    search_lease_seconds: int = 180
+    search_recheck_seconds: int = 30
+    catch_up_enabled: bool = True
+    catch_up_max_window_seconds: int = 21600
+    catch_up_min_gap_seconds: int = 180
+    catch_up_max_pages: int = 10
+    request_timeout_seconds: float = 20.0
+    request_min_timeout_seconds: float = 1.0
+    hedge_enabled: bool = True
+    hedge_percentile: float = 0.95
+    hedge_min_delay_seconds: float = 0.5
+    hedge_min_samples: int = 20
+    hedge_window_size: int = 200
     kufar_bearer_tokens: list[str] = Field(default_factory=list)
+    kufar_token_requests_per_minute: int = 20
+    kufar_token_auth_cooldown_seconds: int = 1800
+    kufar_token_rate_limit_cooldown_seconds: int = 120
+    token_reload_interval_seconds: int = 300
+    rate_limit_initial_rps: float = 2.0
+    rate_limit_min_rps: float = 0.1
+    rate_limit_max_rps: float = 20.0
+    rate_limit_increase_rps: float = 0.25
+    rate_limit_decrease_factor: float = 0.5
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout_seconds: int = 300
+    proxy_routes: dict[str, list[str]] = Field(default_factory=dict)
+    proxy_sticky_patterns: list[str] = Field(
+        default_factory=lambda: ["av.by", "kufar.by"]
+    )
+    proxy_failure_threshold: int = 3
+    proxy_cooldown_seconds: int = 300
+    proxy_health_check_url: str = "https://www.gstatic.com/generate_204"
+    proxy_health_check_timeout_seconds: int = 10
+    proxy_health_check_interval_seconds: int = 120
+    catalog_refresh_interval_seconds: int = 86400
+    catalog_refresh_concurrency: int = 4
     gemini_api_key: str | None = None
+    av_search_mode: str = "api"
+    av_api_search_retry_seconds: int = 900
+    outbox_poll_interval_seconds: int = 5
+    outbox_batch_size: int = 100
+    outbox_max_attempts: int = 8
+    outbox_base_backoff_seconds: int = 10
+    outbox_max_backoff_seconds: int = 3600
+    delivery_workers: int = 4
+    digest_threshold: int = 5
+    digest_window_seconds: int = 600
+    media_delivery_mode: str = "url"
+    media_host_fallback_ttl_seconds: int = 86400
+    image_max_bytes: int = 5_000_000
+    image_memory_budget_bytes: int = 64_000_000
+    image_workers: int = 2
+    image_variant_cache_bytes: int = 128_000_000
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
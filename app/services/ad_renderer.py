@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+
+@dataclass(frozen=True)
+class RenderedAd:
+    url: str
+    platform: str
+    caption: str
+    fallback_text: str
+    summary_line: str
+    image_urls: tuple[str, ...]
+    phone_ad_id: str | None = None
+
+
+class AdRenderer:
+    _cache: OrderedDict[str, RenderedAd] = OrderedDict()
+    _max_cache_size: int = 2048
+    _description_limit: int = 300
+    _max_media_group_size: int = 10
+
+    @classmethod
+    def render(cls, ad: dict) -> RenderedAd:
+        cached = cls._cache.get(ad["url"])
+        if cached:
+            cls._cache.move_to_end(ad["url"])
+            return cached
+
+        rendered = cls._build(ad)
+        cls._cache[ad["url"]] = rendered
+        if len(cls._cache) > cls._max_cache_size:
+            cls._cache.popitem(last=False)
+        return rendered
+
+    @classmethod
+    def render_digest_header(cls, count: int) -> str:
+        return f"<b>📦 Подборка новых объявлений: {count}</b>"
+
+    @classmethod
+    def render_digest(cls, rendered_ads: list[RenderedAd]) -> str:
+        lines = [cls.render_digest_header(len(rendered_ads)), ""]
+        lines.extend(rendered.summary_line for rendered in rendered_ads)
+        return "\n".join(lines)
+
+    @classmethod
+    def _build(cls, ad: dict) -> RenderedAd:
+        data = ad["data"]
+        price = f"≈ ${data.get('price_usd', 0)} / {data.get('price_byn', 0)} р."
+
+        description_snippet = data.get("description") or ""
+        if len(description_snippet) > cls._description_limit:
+            description_snippet = description_snippet[: cls._description_limit] + "..."
+
+        published_at_str = (
+            ad["published_at"]
+            .astimezone(datetime.now().astimezone().tzinfo)
+            .strftime("%H:%M, %d.%m")
+        )
+
+        title = data.get("title", "Без названия").replace("\n", " ").strip()
+        platform_name = ad["platform"].upper()
+        linked_title = f'<a href="{ad["url"]}">{title}</a>'
+
+        caption_parts = [
+            f"<b>{platform_name}: {linked_title}</b>\n",
+            f"<b>Цена:</b> {price}",
+            f"<b>Параметры:</b> {data.get('params', 'Нет данных')}",
+            f"<b>Опубликовано:</b> {published_at_str}",
+        ]
+
+        if phone := data.get("phone"):
+            caption_parts.append(f"<b>Телефон:</b> <code>{phone}</code>")
+
+        if description_snippet:
+            caption_parts.append(f"\n<i>{description_snippet}</i>")
+
+        caption = "\n".join(caption_parts)
+
+        summary_line = f"• <b>{platform_name}:</b> {linked_title} — {price}"
+        if params := data.get("params"):
+            summary_line += f", {params}"
+
+        return RenderedAd(
+            url=ad["url"],
+            platform=ad["platform"],
+            caption=caption,
+            fallback_text=caption,
+            summary_line=summary_line,
+            image_urls=tuple(data.get("images", [])[: cls._max_media_group_size]),
+            phone_ad_id=(
+                ad.get("ad_id")
+                if ad["platform"] == "kufar" and not data.get("phone")
+                else None
+            ),
+        )
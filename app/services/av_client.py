@@ -1,10 +1,18 @@
 import json
 import logging
+import time
 from datetime import datetime
 
 from bs4 import BeautifulSoup
 from curl_cffi.requests import AsyncSession
 
+from app.core.settings import settings
+from app.services.circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
+from app.services.deadline import DeadlineExceededError
+from app.services.http_client import hedged_request, request
+
+AV_SORTING_NEWEST = 4
+
 
 class AvByFilterBuilder:
     def __init__(self, criteria: dict):
@@ -38,11 +46,47 @@ class AvByFilterBuilder:
 
         return self.params
 
+    def build_api_payload(self, page: int = 1) -> dict:
+        properties = []
+
+        if self.criteria.get("brands[0][brand]"):
+            brand_value = [
+                {"name": "brand", "value": self.criteria["brands[0][brand]"]}
+            ]
+            if self.criteria.get("brands[0][model]"):
+                brand_value.append(
+                    {"name": "model", "value": self.criteria["brands[0][model]"]}
+                )
+            properties.append({"name": "brands", "property": 5, "value": [brand_value]})
+
+        price_range = {}
+        if self.criteria.get("price_usd[min]"):
+            price_range["min"] = str(self.criteria["price_usd[min]"])
+        if self.criteria.get("price_usd[max]"):
+            price_range["max"] = str(self.criteria["price_usd[max]"])
+        if price_range:
+            properties.append({"name": "price_currency", "value": 2})
+            properties.append({"name": "price_usd", "value": price_range})
+
+        for key in ["body_type", "engine_type", "transmission_type", "drive_type"]:
+            if self.criteria.get(key):
+                properties.append({"name": key, "value": list(self.criteria[key])})
+
+        if self.criteria.get("condition"):
+            properties.append(
+                {"name": "condition", "value": self.criteria["condition"]}
+            )
+
+        return {"page": page, "properties": properties, "sorting": AV_SORTING_NEWEST}
+
 
 class AvClient:
+    _api_search_failed_at: float = float("-inf")
+
     def __init__(self):
         self.api_base_url = "https://api.av.by/offer-types/cars/catalog"
         self.search_url = "https://cars.av.by/filter"
+        self.api_search_url = "https://api.av.by/offer-types/cars/filters/main/apply"
         self.api_headers = {
             "accept": "application/json, text/plain, */*",
             "x-device-type": "web.desktop",
@@ -56,7 +100,13 @@ class AvClient:
         url = f"{self.api_base_url}/brand-items"
         try:
             async with AsyncSession(impersonate="chrome136") as session:
-                response = await session.get(url, headers=self.api_headers)
+                response = await request(
+                    session,
+                    "GET",
+                    url,
+                    breaker="av:catalog",
+                    headers=self.api_headers,
+                )
                 response.raise_for_status()
                 return response.json()
         except Exception as e:
@@ -67,7 +117,13 @@ class AvClient:
         url = f"{self.api_base_url}/brand-items/{brand_id}/models"
         try:
             async with AsyncSession(impersonate="chrome136") as session:
-                response = await session.get(url, headers=self.api_headers)
+                response = await request(
+                    session,
+                    "GET",
+                    url,
+                    breaker="av:catalog",
+                    headers=self.api_headers,
+                )
                 response.raise_for_status()
                 return response.json()
         except Exception as e:
@@ -77,13 +133,133 @@ class AvClient:
             )
             return []
 
-    async def find_ads(self, criteria: dict):
+    def _parse_advert(self, ad: dict) -> dict:
+        def get_prop(name):
+            for prop in ad.get("properties", []):
+                if prop.get("name") == name:
+                    return prop.get("value")
+            return None
+
+        title_parts = [
+            get_prop("brand"),
+            get_prop("model"),
+            get_prop("generation"),
+        ]
+        title = " ".join(filter(None, title_parts))
+
+        param_parts = [
+            f"{ad.get('year', '')} г.",
+            get_prop("transmission_type"),
+            f"{get_prop('engine_capacity')} л."
+            if get_prop("engine_capacity")
+            else None,
+            get_prop("engine_type"),
+            get_prop("body_type"),
+            f"{get_prop('mileage_km'): ,} км".replace(",", " ")
+            if get_prop("mileage_km")
+            else None,
+        ]
+        params_text = ", ".join(filter(None, param_parts))
+
+        images = [
+            photo["big"]["url"]
+            for photo in ad.get("photos", [])
+            if photo.get("big") and photo["big"].get("url")
+        ]
+
+        return {
+            "url": ad.get("publicUrl"),
+            "ad_id": str(ad.get("id")),
+            "platform": "av",
+            "published_at": datetime.fromisoformat(ad.get("refreshedAt")),
+            "data": {
+                "title": title,
+                "price_usd": ad.get("price", {}).get("usd", {}).get("amount", 0),
+                "price_byn": ad.get("price", {}).get("byn", {}).get("amount", 0),
+                "images": images,
+                "params": params_text,
+                "description": ad.get("description", ""),
+            },
+        }
+
+    def _parse_adverts(self, adverts_data: list[dict]) -> list[dict]:
+        results = []
+        for ad in adverts_data:
+            try:
+                results.append(self._parse_advert(ad))
+            except Exception as e:
+                logging.warning(
+                    f"AV_CLIENT: Could not parse an ad from JSON data. Ad ID: {ad.get('id')}. Error: {e}"
+                )
+                continue
+        return results
+
+    def is_search_available(self) -> bool:
+        api_available = (
+            settings.av_search_mode == "api"
+            and not AvClient._api_search_disabled()
+            and not CircuitBreakerRegistry.is_open("av:search_api")
+        )
+        return api_available or not CircuitBreakerRegistry.is_open("av:search")
+
+    async def find_ads(self, criteria: dict, page: int = 1):
+        if (
+            settings.av_search_mode == "api"
+            and not AvClient._api_search_disabled()
+            and not CircuitBreakerRegistry.is_open("av:search_api")
+        ):
+            try:
+                return await self._find_ads_api(criteria, page)
+            except DeadlineExceededError:
+                raise
+            except CircuitOpenError:
+                pass
+            except Exception as e:
+                AvClient._api_search_failed_at = time.monotonic()
+                logging.warning(
+                    f"AV_CLIENT: API search failed, falling back to HTML scraping. Error: {e}"
+                )
+        return await self._find_ads_html(criteria, page)
+
+    @classmethod
+    def _api_search_disabled(cls) -> bool:
+        return (
+            time.monotonic() - cls._api_search_failed_at
+            < settings.av_api_search_retry_seconds
+        )
+
+    async def _find_ads_api(self, criteria: dict, page: int = 1):
+        payload = AvByFilterBuilder(criteria).build_api_payload(page)
+        async with AsyncSession(impersonate="chrome136") as session:
+            response = await hedged_request(
+                session,
+                "POST",
+                self.api_search_url,
+                breaker="av:search_api",
+                json=payload,
+                headers=self.api_headers,
+            )
+            response.raise_for_status()
+
+        data = response.json()
+        if not isinstance(data, dict) or "adverts" not in data:
+            raise ValueError("Unexpected search API response shape.")
+        return self._parse_adverts(data["adverts"] or [])
+
+    async def _find_ads_html(self, criteria: dict, page: int = 1):
         builder = AvByFilterBuilder(criteria)
         params = builder.build()
+        if page > 1:
+            params["page"] = page
         try:
             async with AsyncSession(impersonate="chrome136") as session:
-                response = await session.get(
-                    self.search_url, params=params, headers=self.scrape_headers
+                response = await hedged_request(
+                    session,
+                    "GET",
+                    self.search_url,
+                    breaker="av:search",
+                    params=params,
+                    headers=self.scrape_headers,
                 )
                 response.raise_for_status()
 
@@ -101,72 +277,12 @@ class AvClient:
                 .get("main", {})
                 .get("adverts", [])
             )
-
-            results = []
-            for ad in adverts_data:
-                try:
-
-                    def get_prop(name):
-                        for prop in ad.get("properties", []):
-                            if prop.get("name") == name:
-                                return prop.get("value")
-                        return None
-
-                    title_parts = [
-                        get_prop("brand"),
-                        get_prop("model"),
-                        get_prop("generation"),
-                    ]
-                    title = " ".join(filter(None, title_parts))
-
-                    param_parts = [
-                        f"{ad.get('year', '')} г.",
-                        get_prop("transmission_type"),
-                        f"{get_prop('engine_capacity')} л."
-                        if get_prop("engine_capacity")
-                        else None,
-                        get_prop("engine_type"),
-                        get_prop("body_type"),
-                        f"{get_prop('mileage_km'): ,} км".replace(",", " ")
-                        if get_prop("mileage_km")
-                        else None,
-                    ]
-                    params_text = ", ".join(filter(None, param_parts))
-
-                    images = [
-                        photo["big"]["url"]
-                        for photo in ad.get("photos", [])
-                        if photo.get("big") and photo["big"].get("url")
-                    ]
-
-                    results.append(
-                        {
-                            "url": ad.get("publicUrl"),
-                            "ad_id": str(ad.get("id")),
-                            "platform": "av",
-                            "published_at": datetime.fromisoformat(
-                                ad.get("refreshedAt")
-                            ),
-                            "data": {
-                                "title": title,
-                                "price_usd": ad.get("price", {})
-                                .get("usd", {})
-                                .get("amount", 0),
-                                "price_byn": ad.get("price", {})
-                                .get("byn", {})
-                                .get("amount", 0),
-                                "images": images,
-                                "params": params_text,
-                                "description": ad.get("description", ""),
-                            },
-                        }
-                    )
-                except Exception as e:
-                    logging.warning(
-                        f"AV_CLIENT: Could not parse an ad from JSON data. Ad ID: {ad.get('id')}. Error: {e}"
-                    )
-                    continue
-            return results
+            return self._parse_adverts(adverts_data)
+        except DeadlineExceededError:
+            raise
+        except CircuitOpenError as e:
+            logging.info(f"AV_CLIENT: {e}")
+            return []
         except Exception as e:
             logging.error(f"AV_CLIENT: FAILED to scrape ads. Error: {e}", exc_info=True)
             return []
@@ -174,7 +290,13 @@ class AvClient:
     async def get_ad_details(self, url: str) -> dict | None:
         try:
             async with AsyncSession(impersonate="chrome136") as session:
-                response = await session.get(url, headers=self.scrape_headers)
+                response = await request(
+                    session,
+                    "GET",
+                    url,
+                    breaker="av:details",
+                    headers=self.scrape_headers,
+                )
                 response.raise_for_status()
 
             soup = BeautifulSoup(response.text, "html.parser")
@@ -194,56 +316,11 @@ class AvClient:
                 logging.warning(f"AV_CLIENT: Advert data not in JSON for url {url}")
                 return None
 
-            def get_prop(name):
-                for prop in ad.get("properties", []):
-                    if prop.get("name") == name:
-                        return prop.get("value")
-                return None
-
-            title_parts = [
-                get_prop("brand"),
-                get_prop("model"),
-                get_prop("generation"),
-            ]
-            title = " ".join(filter(None, title_parts))
-
-            param_parts = [
-                f"{ad.get('year', '')} г.",
-                get_prop("transmission_type"),
-                f"{get_prop('engine_capacity')} л."
-                if get_prop("engine_capacity")
-                else None,
-                get_prop("engine_type"),
-                get_prop("body_type"),
-                f"{get_prop('mileage_km'): ,} км".replace(",", " ")
-                if get_prop("mileage_km")
-                else None,
+            result = self._parse_advert(ad)
+            result["data"]["options"] = [
+                opt["name"] for opt in ad.get("metadata", {}).get("options", [])
             ]
-            params_text = ", ".join(filter(None, param_parts))
-
-            images = [
-                photo["big"]["url"]
-                for photo in ad.get("photos", [])
-                if photo.get("big") and photo["big"].get("url")
-            ]
-
-            return {
-                "url": ad.get("publicUrl"),
-                "ad_id": str(ad.get("id")),
-                "platform": "av",
-                "published_at": datetime.fromisoformat(ad.get("refreshedAt")),
-                "data": {
-                    "title": title,
-                    "price_usd": ad.get("price", {}).get("usd", {}).get("amount", 0),
-                    "price_byn": ad.get("price", {}).get("byn", {}).get("amount", 0),
-                    "images": images,
-                    "params": params_text,
-                    "description": ad.get("description", ""),
-                    "options": [
-                        opt["name"] for opt in ad.get("metadata", {}).get("options", [])
-                    ],
-                },
-            }
+            return result
         except Exception as e:
             logging.error(
                 f"AV_CLIENT: FAILED to get ad details for {url}. Error: {e}",
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.db_queries import get_catalog_snapshot, save_catalog_snapshot
+from app.core.settings import settings
+from app.services.av_client import AvClient
+from app.services.kufar_client import KufarClient
+
+CATALOG_NAME = "brands_models"
+PLATFORMS = ("av", "kufar", "both")
+
+
+def unify_with_av(av_items: list[dict], kufar_items: list[dict]) -> list[dict]:
+    av_item_map = {item["name"].lower(): item for item in av_items}
+    unified = []
+    for kufar_item in kufar_items:
+        name = kufar_item.get("labels", {}).get("ru")
+        if not name:
+            continue
+        av_item = av_item_map.get(name.lower())
+        if av_item:
+            unified.append(
+                {"id": av_item["id"], "name": name, "slug": kufar_item["value"]}
+            )
+    return unified
+
+
+def intersect_by_id(av_items: list[dict], kufar_items: list[dict]) -> list[dict]:
+    kufar_ids = {item["id"] for item in kufar_items}
+    return [item for item in av_items if item["id"] in kufar_ids]
+
+
+def serialize_catalog(brands: dict, models: dict) -> str:
+    data = {
+        "brands": brands,
+        "models": {
+            platform: {str(brand_id): items for brand_id, items in by_brand.items()}
+            for platform, by_brand in models.items()
+        },
+    }
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+class BrandCatalog:
+    _version: int = 0
+    _updated_at: datetime | None = None
+    _brands: dict[str, list[dict]] = {platform: [] for platform in PLATFORMS}
+    _models: dict[str, dict[int, list[dict]]] = {platform: {} for platform in PLATFORMS}
+    _kufar_slugs: dict[int, str] = {}
+    _session_maker: async_sessionmaker | None = None
+    _refresh_task: asyncio.Task | None = None
+    _brands_ready: asyncio.Event | None = None
+
+    @classmethod
+    def version(cls) -> int:
+        return cls._version
+
+    @classmethod
+    def _apply(
+        cls, version: int, brands: dict, models: dict, updated_at: datetime | None
+    ):
+        cls._brands = {platform: brands.get(platform, []) for platform in PLATFORMS}
+        cls._models = {
+            platform: {
+                int(brand_id): items
+                for brand_id, items in models.get(platform, {}).items()
+            }
+            for platform in PLATFORMS
+        }
+        cls._kufar_slugs = {
+            brand["id"]: brand["slug"] for brand in cls._brands["kufar"]
+        }
+        cls._version = version
+        cls._updated_at = updated_at
+
+    @classmethod
+    async def load(cls, session_maker: async_sessionmaker):
+        cls._session_maker = session_maker
+        try:
+            async with session_maker() as session:
+                snapshot = await get_catalog_snapshot(session, CATALOG_NAME)
+        except Exception as e:
+            logging.error(f"CATALOG: Failed to load the persisted catalog. Error: {e}")
+            return
+
+        if not snapshot:
+            logging.info("CATALOG: No persisted catalog found.")
+            return
+
+        updated_at = snapshot.updated_at
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        data = json.loads(snapshot.data)
+        cls._apply(snapshot.version, data["brands"], data["models"], updated_at)
+        logging.info(
+            f"CATALOG: Loaded version {cls._version} with {len(cls._brands['av'])} AV.BY "
+            f"and {len(cls._brands['kufar'])} Kufar brands."
+        )
+
+    @classmethod
+    def is_stale(cls) -> bool:
+        if not cls._brands["av"] or cls._updated_at is None:
+            return True
+        age = datetime.now(timezone.utc) - cls._updated_at
+        return age.total_seconds() >= settings.catalog_refresh_interval_seconds
+
+    @classmethod
+    def refresh_in_background(cls) -> asyncio.Task:
+        if cls._refresh_task is None or cls._refresh_task.done():
+            cls._brands_ready = asyncio.Event()
+            cls._refresh_task = asyncio.create_task(cls._rebuild(cls._brands_ready))
+        return cls._refresh_task
+
+    @classmethod
+    async def refresh(cls):
+        await asyncio.shield(cls.refresh_in_background())
+
+    @classmethod
+    async def _fetch_brand_models(
+        cls,
+        av_client: AvClient,
+        kufar_client: KufarClient,
+        brand_id: int,
+        kufar_slug: str | None,
+    ) -> dict[str, list[dict]]:
+        av_models = await av_client.get_models(brand_id) or cls._models["av"].get(
+            brand_id, []
+        )
+        brand_models = {"av": av_models}
+        if not kufar_slug:
+            return brand_models
+
+        raw_models = await kufar_client.get_raw_models(kufar_slug)
+        if raw_models:
+            kufar_models = unify_with_av(av_models, raw_models)
+        else:
+            kufar_models = cls._models["kufar"].get(brand_id, [])
+        brand_models["kufar"] = kufar_models
+
+        if av_models and kufar_models:
+            brand_models["both"] = intersect_by_id(av_models, kufar_models)
+        else:
+            brand_models["both"] = av_models or kufar_models
+        return brand_models
+
+    @classmethod
+    async def _rebuild(cls, brands_ready: asyncio.Event):
+        try:
+            await cls._rebuild_catalog(brands_ready)
+        finally:
+            brands_ready.set()
+
+    @classmethod
+    async def _rebuild_catalog(cls, brands_ready: asyncio.Event):
+        av_client = AvClient()
+        kufar_client = KufarClient()
+
+        logging.info("CATALOG: Refreshing brands and models...")
+        av_brands_raw = await av_client.get_brands()
+        if not av_brands_raw:
+            logging.error(
+                f"CATALOG: Failed to fetch AV.BY brands, keeping version {cls._version}."
+            )
+            return
+        av_brands = sorted(av_brands_raw, key=lambda x: x["name"])
+
+        kufar_brands_raw = await kufar_client.get_raw_brands()
+        if kufar_brands_raw:
+            kufar_brands = sorted(
+                unify_with_av(av_brands, kufar_brands_raw), key=lambda x: x["name"]
+            )
+        else:
+            logging.error(
+                "CATALOG: Failed to fetch Kufar brands, keeping the old ones."
+            )
+            kufar_brands = cls._brands["kufar"]
+        kufar_slugs = {brand["id"]: brand["slug"] for brand in kufar_brands}
+        brands = {
+            "av": av_brands,
+            "kufar": kufar_brands,
+            "both": intersect_by_id(av_brands, kufar_brands),
+        }
+
+        if not cls._brands["av"]:
+            cls._apply(cls._version + 1, brands, cls._models, cls._updated_at)
+            logging.info(
+                f"CATALOG: Published {len(av_brands)} AV.BY and {len(kufar_brands)} Kufar "
+                "brands, fetching models in the background."
+            )
+        brands_ready.set()
+
+        semaphore = asyncio.Semaphore(settings.catalog_refresh_concurrency)
+
+        async def fetch(brand_id: int):
+            async with semaphore:
+                return brand_id, await cls._fetch_brand_models(
+                    av_client, kufar_client, brand_id, kufar_slugs.get(brand_id)
+                )
+
+        models = {platform: {} for platform in PLATFORMS}
+        for brand_id, brand_models in await asyncio.gather(
+            *(fetch(brand["id"]) for brand in av_brands)
+        ):
+            for platform, items in brand_models.items():
+                models[platform][brand_id] = items
+
+        data = serialize_catalog(brands, models)
+        changed = data != serialize_catalog(cls._brands, cls._models)
+        version = cls._version + 1 if changed else cls._version
+        cls._apply(version, brands, models, datetime.now(timezone.utc))
+        logging.info(
+            f"CATALOG: Refreshed to version {version} ({'changed' if changed else 'unchanged'}) "
+            f"with {len(av_brands)} AV.BY and {len(kufar_brands)} Kufar brands."
+        )
+
+        if cls._session_maker is None:
+            return
+        try:
+            async with cls._session_maker() as session:
+                await save_catalog_snapshot(session, CATALOG_NAME, version, data)
+        except Exception as e:
+            logging.error(f"CATALOG: Failed to persist version {version}. Error: {e}")
+
+    @classmethod
+    async def get_brands(cls, platform: str) -> list[dict]:
+        if not cls._brands["av"]:
+            cls.refresh_in_background()
+            await cls._brands_ready.wait()
+        return cls._brands.get(platform, [])
+
+    @classmethod
+    async def get_models(
+        cls, platform: str, brand_id: int, brand_slug: str | None = None
+    ) -> list[dict]:
+        if platform not in PLATFORMS:
+            return []
+        models = cls._models[platform].get(brand_id)
+        if models is not None:
+            return models
+
+        kufar_slug = cls._kufar_slugs.get(brand_id)
+        if platform == "kufar":
+            kufar_slug = kufar_slug or brand_slug
+        brand_models = await cls._fetch_brand_models(
+            AvClient(), KufarClient(), brand_id, kufar_slug
+        )
+        for model_platform, items in brand_models.items():
+            if items:
+                cls._models[model_platform][brand_id] = items
+        return brand_models.get(platform, [])
@@ -0,0 +1,87 @@
+import logging
+import time
+
+from app.core.settings import settings
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def _reset_timeout_elapsed(self) -> bool:
+        return (
+            time.monotonic() - self.opened_at >= settings.circuit_reset_timeout_seconds
+        )
+
+    def is_open(self) -> bool:
+        return self.state == self.OPEN and not self._reset_timeout_elapsed()
+
+    def allow_request(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if not self._reset_timeout_elapsed():
+                return False
+            self._transition(self.HALF_OPEN)
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def release_probe(self):
+        self._probe_in_flight = False
+
+    def record_success(self):
+        self._probe_in_flight = False
+        self.failures = 0
+        if self.state != self.CLOSED:
+            self._transition(self.CLOSED)
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED
+            and self.failures >= settings.circuit_failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+            self._transition(self.OPEN)
+
+    def _transition(self, state: str):
+        logging.warning(
+            f"CIRCUIT_BREAKER: {self.name} {self.state} -> {state} (failures: {self.failures})."
+        )
+        self.state = state
+
+
+class CircuitBreakerRegistry:
+    _breakers: dict[str, CircuitBreaker] = {}
+
+    @classmethod
+    def get(cls, name: str) -> CircuitBreaker:
+        breaker = cls._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name)
+            cls._breakers[name] = breaker
+        return breaker
+
+    @classmethod
+    def is_open(cls, name: str) -> bool:
+        breaker = cls._breakers.get(name)
+        return breaker is not None and breaker.is_open()
+
+    @classmethod
+    def states(cls) -> dict[str, str]:
+        return {name: breaker.state for name, breaker in cls._breakers.items()}
@@ -3,6 +3,8 @@ import time
 
 from curl_cffi.requests import AsyncSession
 
+from app.services.http_client import request
+
 
 class CurrencyConverter:
     _usd_rate: float = 3.0
@@ -17,7 +19,7 @@ class CurrencyConverter:
             try:
                 url = "https://api.nbrb.by/exrates/rates/431"
                 async with AsyncSession() as session:
-                    response = await session.get(url, timeout=5)
+                    response = await request(session, "GET", url, timeout=5)
                     response.raise_for_status()
 
                 rate_data = response.json()
@@ -0,0 +1,46 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.core.settings import settings
+
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceededError(Exception):
+    pass
+
+
+@contextmanager
+def deadline(seconds: float):
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return expires_at - time.monotonic()
+
+
+def is_expired(margin: float = 0.0) -> bool:
+    time_left = remaining()
+    return time_left is not None and time_left <= margin
+
+
+def get_request_timeout(requested: float | None) -> tuple[float, bool]:
+    timeout = requested or settings.request_timeout_seconds
+    time_left = remaining()
+    if time_left is None or time_left >= timeout:
+        return timeout, False
+    if time_left < settings.request_min_timeout_seconds:
+        raise DeadlineExceededError(f"Deadline exceeded ({time_left:.2f}s left)")
+    return time_left, True
@@ -0,0 +1,292 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from aiogram import Bot
+from aiogram.enums import ChatAction
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+from aiogram.types import Message
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.bot.keyboards.inline import get_phone_reveal_keyboard
+from app.bot.utils.message_splitter import send_long_message
+from app.core.db_queries import (
+    complete_outbox_messages,
+    get_due_outbox_messages,
+    get_sent_ad_pairs,
+    reschedule_outbox_message,
+)
+from app.core.models import Ad, OutboxMessage, Subscription
+from app.core.settings import settings
+from app.services.ad_renderer import AdRenderer, RenderedAd
+from app.services.av_client import AvClient
+from app.services.gemini_client import analyze_ad
+from app.services.media_delivery import (
+    send_media_group_with_fallback,
+    send_photo_with_fallback,
+)
+
+
+def ad_row_to_dict(ad: Ad) -> dict:
+    published_at = ad.published_at
+    if published_at and published_at.tzinfo is None:
+        published_at = published_at.replace(tzinfo=timezone.utc)
+    return {
+        "url": ad.url,
+        "ad_id": ad.ad_id,
+        "platform": ad.platform,
+        "published_at": published_at or datetime.now(timezone.utc),
+        "data": ad.data or {},
+    }
+
+
+async def send_ad_to_user(
+    bot: Bot, user_id: int, rendered: RenderedAd
+) -> Message | None:
+    reply_markup = None
+    if rendered.phone_ad_id and settings.kufar_bearer_tokens:
+        reply_markup = get_phone_reveal_keyboard(rendered.phone_ad_id)
+
+    sent_message = None
+    if len(rendered.image_urls) == 1:
+        sent_message = await send_photo_with_fallback(
+            bot, user_id, rendered.image_urls[0], rendered.caption, reply_markup
+        )
+    elif rendered.image_urls:
+        sent_messages = await send_media_group_with_fallback(
+            bot, user_id, list(rendered.image_urls), rendered.caption
+        )
+        sent_message = sent_messages[0] if sent_messages else None
+        if sent_message and reply_markup:
+            await bot.send_message(
+                chat_id=user_id,
+                text="📞 Телефон продавца доступен по кнопке ниже.",
+                reply_to_message_id=sent_message.message_id,
+                reply_markup=reply_markup,
+            )
+
+    if sent_message:
+        return sent_message
+
+    return await bot.send_message(
+        chat_id=user_id,
+        text=rendered.fallback_text,
+        disable_web_page_preview=True,
+        reply_markup=reply_markup,
+    )
+
+
+async def send_digest_to_user(bot: Bot, user_id: int, rendered_ads: list[RenderedAd]):
+    cover_urls = [
+        rendered.image_urls[0] for rendered in rendered_ads if rendered.image_urls
+    ][:10]
+    if cover_urls:
+        await send_media_group_with_fallback(
+            bot,
+            user_id,
+            cover_urls,
+            AdRenderer.render_digest_header(len(rendered_ads)),
+        )
+
+    await send_long_message(
+        bot,
+        user_id,
+        AdRenderer.render_digest(rendered_ads),
+        parse_mode="HTML",
+        disable_web_page_preview=True,
+    )
+
+
+async def send_ai_analysis(bot: Bot, user_id: int, ad: dict, sent_message: Message):
+    try:
+        await bot.send_chat_action(user_id, ChatAction.TYPING)
+        full_ad_data = ad
+        if ad["platform"] == "av":
+            av_client = AvClient()
+            detailed_data = await av_client.get_ad_details(ad["url"])
+            if detailed_data:
+                full_ad_data = detailed_data
+
+        analysis = await analyze_ad(full_ad_data)
+        if analysis:
+            await send_long_message(
+                bot,
+                user_id,
+                analysis,
+                reply_to_message_id=sent_message.message_id,
+            )
+            await asyncio.sleep(1)
+    except Exception as e:
+        logging.error(
+            f"Failed to send AI analysis for ad {ad.get('url')} to {user_id}: {e}"
+        )
+
+
+def get_backoff_delay(attempts: int) -> float:
+    delay = settings.outbox_base_backoff_seconds * (2 ** (attempts - 1))
+    return min(delay, settings.outbox_max_backoff_seconds)
+
+
+def is_digest_subscription(subscription: Subscription, pending_count: int) -> bool:
+    if subscription.delivery_mode == "digest":
+        return True
+    if subscription.delivery_mode == "single":
+        return False
+    return pending_count >= settings.digest_threshold
+
+
+def plan_deliveries(messages: list[OutboxMessage]) -> list[list[OutboxMessage]]:
+    by_subscription = defaultdict(list)
+    for message in messages:
+        by_subscription[message.subscription_id].append(message)
+
+    batches = []
+    for sub_messages in by_subscription.values():
+        if is_digest_subscription(sub_messages[0].subscription, len(sub_messages)):
+            batches.append(sub_messages)
+        else:
+            batches.extend([message] for message in sub_messages)
+    return batches
+
+
+async def deliver_user_messages(bot: Bot, user_id: int, messages: list[OutboxMessage]):
+    delivered = []
+    dropped = []
+    failed = []
+
+    batches = plan_deliveries(messages)
+    for index, batch in enumerate(batches):
+        ads = [ad_row_to_dict(message.ad) for message in batch]
+        sent_message = None
+        try:
+            if len(batch) == 1:
+                sent_message = await send_ad_to_user(
+                    bot, user_id, AdRenderer.render(ads[0])
+                )
+            else:
+                await send_digest_to_user(
+                    bot, user_id, [AdRenderer.render(ad) for ad in ads]
+                )
+            delivered.extend(batch)
+        except TelegramForbiddenError as e:
+            remaining = [message for rest in batches[index:] for message in rest]
+            logging.warning(
+                f"DELIVERY: User {user_id} blocked the bot. Dropping {len(remaining)} pending messages. Error: {e}"
+            )
+            dropped.extend(remaining)
+            break
+        except TelegramRetryAfter as e:
+            remaining = [message for rest in batches[index:] for message in rest]
+            for message in remaining:
+                failed.append((message, str(e), float(e.retry_after)))
+            break
+        except TelegramAPIError as e:
+            if "message is not modified" in str(e):
+                logging.warning(
+                    f"Ads {[ad.get('url') for ad in ads]} were already sent to {user_id}. Marking as sent."
+                )
+                delivered.extend(batch)
+            else:
+                for message in batch:
+                    failed.append(
+                        (message, str(e), get_backoff_delay(message.attempts + 1))
+                    )
+            continue
+        except Exception as e:
+            for message in batch:
+                failed.append(
+                    (message, str(e), get_backoff_delay(message.attempts + 1))
+                )
+            continue
+
+        if (
+            sent_message
+            and batch[0].subscription.user.ai_analysis_enabled
+            and settings.gemini_api_key
+        ):
+            await send_ai_analysis(bot, user_id, ads[0], sent_message)
+
+        await asyncio.sleep(1)
+
+    return delivered, dropped, failed
+
+
+async def drain_outbox(bot: Bot, session_maker: async_sessionmaker):
+    semaphore = asyncio.Semaphore(settings.delivery_workers)
+
+    async with session_maker() as session:
+        while True:
+            messages = await get_due_outbox_messages(
+                session, settings.outbox_batch_size
+            )
+            if not messages:
+                return
+
+            obsolete_ids = [
+                m.id
+                for m in messages
+                if m.subscription is None or not m.subscription.is_active
+            ]
+            live_messages = [m for m in messages if m.id not in obsolete_ids]
+
+            already_sent = await get_sent_ad_pairs(
+                session,
+                list({m.subscription_id for m in live_messages}),
+                list({m.ad_url for m in live_messages}),
+            )
+            duplicate_ids = [
+                m.id
+                for m in live_messages
+                if (m.subscription_id, m.ad_url) in already_sent
+            ]
+            live_messages = [m for m in live_messages if m.id not in duplicate_ids]
+
+            by_user = defaultdict(list)
+            for message in live_messages:
+                by_user[message.subscription.user_id].append(message)
+
+            async def deliver(user_id: int, user_messages: list[OutboxMessage]):
+                async with semaphore:
+                    return await deliver_user_messages(bot, user_id, user_messages)
+
+            results = await asyncio.gather(
+                *(deliver(user_id, msgs) for user_id, msgs in by_user.items())
+            )
+
+            delivered_pairs = []
+            finished_ids = obsolete_ids + duplicate_ids
+            now = datetime.now(timezone.utc)
+            for delivered, dropped, failed in results:
+                for message in delivered:
+                    delivered_pairs.append((message.subscription_id, message.ad_url))
+                    finished_ids.append(message.id)
+                finished_ids.extend(message.id for message in dropped)
+
+                for message, error, delay in failed:
+                    attempts = message.attempts + 1
+                    if attempts >= settings.outbox_max_attempts:
+                        logging.error(
+                            f"DELIVERY: Giving up on ad {message.ad_url} for subscription {message.subscription_id} after {attempts} attempts. Last error: {error}"
+                        )
+                        finished_ids.append(message.id)
+                        continue
+                    logging.warning(
+                        f"DELIVERY: Failed to send ad {message.ad_url} to subscription {message.subscription_id} (attempt {attempts}), retrying in {delay:.0f}s. Error: {error}"
+                    )
+                    await reschedule_outbox_message(
+                        session,
+                        message.id,
+                        attempts,
+                        now + timedelta(seconds=delay),
+                        error,
+                    )
+
+            await complete_outbox_messages(session, delivered_pairs, finished_ids)
+
+            if len(messages) < settings.outbox_batch_size:
+                return
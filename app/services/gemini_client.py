@@ -1,11 +1,57 @@
 import asyncio
 import logging
 
-import google.generativeai as genai
-from google.generativeai.types import GenerationConfig, HarmBlockThreshold, HarmCategory
-
 from app.core.settings import settings
-from app.utils.image_downloader import download_image_to_bytes
+from app.services.image_processor import ImageProcessor
+from app.services.proxy_pool import ProxyRouter
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/"
+GEMINI_MODEL = "models/gemini-2.5-flash"
+UNFILTERED_CATEGORIES = (
+    "HARM_CATEGORY_HARASSMENT",
+    "HARM_CATEGORY_HATE_SPEECH",
+    "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+    "HARM_CATEGORY_DANGEROUS_CONTENT",
+)
+
+
+def import_generativelanguage():
+    from google.ai import generativelanguage_v1beta as glm
+
+    return glm
+
+
+def build_proxied_transport(proxy: str):
+    from google.ai.generativelanguage_v1beta.services.generative_service.transports import (
+        GenerativeServiceGrpcAsyncIOTransport,
+    )
+
+    def create_channel(*args, options=(), **kwargs):
+        return GenerativeServiceGrpcAsyncIOTransport.create_channel(
+            *args, options=[*options, ("grpc.http_proxy", proxy)], **kwargs
+        )
+
+    def build_transport(**kwargs):
+        return GenerativeServiceGrpcAsyncIOTransport(channel=create_channel, **kwargs)
+
+    return build_transport
+
+
+class GeminiClientCache:
+    _clients: dict[tuple[str, str | None], object] = {}
+
+    @classmethod
+    def get(cls, api_key: str, proxy: str | None):
+        key = (api_key, proxy)
+        client = cls._clients.get(key)
+        if client is None:
+            glm = import_generativelanguage()
+            client = glm.GenerativeServiceAsyncClient(
+                client_options={"api_key": api_key},
+                transport=build_proxied_transport(proxy) if proxy else "grpc_asyncio",
+            )
+            cls._clients[key] = client
+        return client
 
 
 async def analyze_ad(ad_data: dict) -> str | None:
@@ -13,9 +59,11 @@ async def analyze_ad(ad_data: dict) -> str | None:
         logging.warning("GEMINI_CLIENT: API key is not configured.")
         return None
 
+    glm = import_generativelanguage()
+    pool, proxy = ProxyRouter.acquire(GEMINI_API_URL)
+    succeeded = False
     try:
-        genai.configure(api_key=settings.gemini_api_key)
-        model = genai.GenerativeModel("gemini-2.5-flash")
+        client = GeminiClientCache.get(settings.gemini_api_key, proxy)
 
         data = ad_data.get("data", {})
         title = data.get("title", "Без названия")
@@ -46,36 +94,42 @@ async def analyze_ad(ad_data: dict) -> str | None:
 """
 
         image_urls = data.get("images", [])[:4]
-        image_parts = []
+        parts = [glm.Part(text=prompt)]
         if image_urls:
-            tasks = [download_image_to_bytes(url) for url in image_urls]
+            tasks = [ImageProcessor.get_variant(url, "llm") for url in image_urls]
             image_bytes_list = await asyncio.gather(*tasks)
             for image_bytes in image_bytes_list:
                 if image_bytes:
-                    image_parts.append({"mime_type": "image/jpeg", "data": image_bytes})
-
-        prompt_parts = [prompt, *image_parts]
-
-        generation_config = GenerationConfig(
-            temperature=0.1,
-        )
+                    parts.append(
+                        glm.Part(
+                            inline_data=glm.Blob(
+                                mime_type="image/jpeg", data=image_bytes
+                            )
+                        )
+                    )
 
-        response = await model.generate_content_async(
-            prompt_parts,
-            generation_config=generation_config,
-            safety_settings={
-                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-            },
+        request = glm.GenerateContentRequest(
+            model=GEMINI_MODEL,
+            contents=[glm.Content(role="user", parts=parts)],
+            generation_config=glm.GenerationConfig(temperature=0.1),
+            safety_settings=[
+                glm.SafetySetting(
+                    category=category,
+                    threshold=glm.SafetySetting.HarmBlockThreshold.BLOCK_NONE,
+                )
+                for category in UNFILTERED_CATEGORIES
+            ],
         )
+        response = await client.generate_content(request)
 
-        if response.parts:
-            return "".join(part.text for part in response.parts)
+        succeeded = True
+        candidate = response.candidates[0] if response.candidates else None
+        response_parts = candidate.content.parts if candidate else []
+        if response_parts:
+            return "".join(part.text for part in response_parts)
         else:
             logging.warning(
-                f"GEMINI_CLIENT: No parts in response for ad {ad_data.get('url')}. Finish reason: {response.prompt_feedback, response.candidates[0].finish_reason}"
+                f"GEMINI_CLIENT: No parts in response for ad {ad_data.get('url')}. Finish reason: {response.prompt_feedback, candidate.finish_reason if candidate else None}"
             )
             return "Анализ не удался. Модель не смогла сформировать полный ответ из-за внутренних ограничений."
     except Exception as e:
@@ -84,3 +138,6 @@ async def analyze_ad(ad_data: dict) -> str | None:
             exc_info=True,
         )
         return "Не удалось получить анализ от ИИ. Попробуйте позже."
+    finally:
+        if pool:
+            pool.release(proxy, ok=succeeded)
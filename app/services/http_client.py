@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from urllib.parse import urlparse
+
+from curl_cffi.requests import AsyncSession
+
+from app.core.settings import settings
+from app.services.circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
+from app.services.deadline import (
+    DeadlineExceededError,
+    get_request_timeout,
+    is_expired,
+    remaining,
+)
+from app.services.latency_tracker import LatencyTracker
+from app.services.proxy_pool import ProxyRouter, proxy_label
+from app.services.rate_limiter import RateLimiterRegistry, is_challenge_page
+
+
+def get_failure_reason(response, headers: dict, stream: bool) -> str | None:
+    is_authorized = any(key.lower() == "authorization" for key in headers)
+
+    status_code = response.status_code
+    if status_code == 407:
+        return "proxy authentication failed"
+    if is_authorized and status_code in (401, 403, 429):
+        return None
+    if status_code in (403, 429) or status_code >= 500:
+        return f"HTTP {status_code}"
+    if not stream and is_challenge_page(response):
+        return "challenge page"
+    return None
+
+
+async def request(
+    session: AsyncSession,
+    method: str,
+    url: str,
+    breaker: str | None = None,
+    sticky: bool = True,
+    **kwargs,
+):
+    requested_timeout = kwargs.pop("timeout", None)
+    get_request_timeout(requested_timeout)
+
+    circuit = CircuitBreakerRegistry.get(breaker) if breaker else None
+    if circuit and not circuit.allow_request():
+        raise CircuitOpenError(f"Circuit {breaker} is open, skipping {url}")
+
+    pool, proxy = None, kwargs.get("proxy")
+    if proxy is None:
+        pool, proxy = ProxyRouter.acquire(url, session if sticky else None)
+        if proxy:
+            kwargs["proxy"] = proxy
+
+    limiter = RateLimiterRegistry.get(url, proxy_label(proxy) if proxy else None)
+    deadline_limited = False
+    try:
+        await limiter.acquire()
+        timeout, deadline_limited = get_request_timeout(requested_timeout)
+        started_at = time.monotonic()
+        response = await session.request(method, url, timeout=timeout, **kwargs)
+    except (asyncio.CancelledError, DeadlineExceededError):
+        if pool:
+            pool.release(proxy, ok=None)
+        if circuit:
+            circuit.release_probe()
+        raise
+    except Exception as e:
+        if deadline_limited and is_expired(settings.request_min_timeout_seconds):
+            if pool:
+                pool.release(proxy, ok=None)
+            if circuit:
+                circuit.release_probe()
+            raise DeadlineExceededError(
+                f"Deadline exceeded while fetching {url}"
+            ) from e
+        if pool:
+            pool.release(proxy, ok=False)
+        limiter.on_throttle("network error")
+        if circuit:
+            circuit.record_failure()
+        raise
+
+    failure_reason = get_failure_reason(
+        response, kwargs.get("headers") or {}, bool(kwargs.get("stream"))
+    )
+    if pool:
+        pool.release(proxy, ok=failure_reason is None)
+    if failure_reason:
+        limiter.on_throttle(failure_reason)
+        if circuit:
+            circuit.record_failure()
+    else:
+        LatencyTracker.record(
+            breaker or urlparse(url).hostname or "", time.monotonic() - started_at
+        )
+        limiter.on_success()
+        if circuit:
+            circuit.record_success()
+    return response
+
+
+async def hedged_request(
+    session: AsyncSession,
+    method: str,
+    url: str,
+    breaker: str | None = None,
+    **kwargs,
+):
+    delay = None
+    if settings.hedge_enabled:
+        delay = LatencyTracker.percentile(
+            breaker or urlparse(url).hostname or "", settings.hedge_percentile
+        )
+    if delay is not None:
+        delay = max(delay, settings.hedge_min_delay_seconds)
+    time_left = remaining()
+    if delay is None or (time_left is not None and time_left <= delay):
+        return await request(session, method, url, breaker, **kwargs)
+
+    pending = {asyncio.ensure_future(request(session, method, url, breaker, **kwargs))}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return done.pop().result()
+
+        logging.info(
+            f"HTTP_CLIENT: {breaker or url} is slower than {delay:.2f}s, sending a hedged request."
+        )
+        pending.add(
+            asyncio.ensure_future(
+                request(session, method, url, breaker, sticky=False, **kwargs)
+            )
+        )
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
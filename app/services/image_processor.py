@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from aiogram.types import BufferedInputFile
+from PIL import Image, ImageOps
+
+from app.core.settings import settings
+from app.utils.image_downloader import download_image_to_bytes
+
+IMAGE_VARIANTS = {
+    "llm": {"max_side": 768, "quality": 80},
+    "telegram": {"max_side": 1280, "quality": 85},
+}
+
+
+def resize_to_variants(image_bytes: bytes) -> dict[str, bytes]:
+    with Image.open(BytesIO(image_bytes)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        variants = {}
+        for variant, options in sorted(
+            IMAGE_VARIANTS.items(), key=lambda item: -item[1]["max_side"]
+        ):
+            image.thumbnail((options["max_side"], options["max_side"]))
+            output = BytesIO()
+            image.save(output, format="JPEG", quality=options["quality"], optimize=True)
+            variants[variant] = output.getvalue()
+        return variants
+
+
+class ImageProcessor:
+    _executor: ThreadPoolExecutor | None = None
+    _url_index: OrderedDict[tuple[str, str], tuple[str, str]] = OrderedDict()
+    _content_cache: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+    _cached_bytes: int = 0
+    _max_url_entries: int = 10000
+    _in_flight: dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=settings.image_workers, thread_name_prefix="image"
+            )
+        return cls._executor
+
+    @classmethod
+    def _lookup_content(cls, content_key: tuple[str, str]) -> bytes | None:
+        data = cls._content_cache.get(content_key)
+        if data is not None:
+            cls._content_cache.move_to_end(content_key)
+        return data
+
+    @classmethod
+    def _store(
+        cls, url_key: tuple[str, str], content_key: tuple[str, str], data: bytes
+    ):
+        cls._url_index[url_key] = content_key
+        cls._url_index.move_to_end(url_key)
+        if len(cls._url_index) > cls._max_url_entries:
+            cls._url_index.popitem(last=False)
+
+        if content_key not in cls._content_cache:
+            cls._content_cache[content_key] = data
+            cls._cached_bytes += len(data)
+        while cls._cached_bytes > settings.image_variant_cache_bytes:
+            _, evicted = cls._content_cache.popitem(last=False)
+            cls._cached_bytes -= len(evicted)
+
+    @classmethod
+    async def get_variant(cls, url: str, variant: str) -> bytes | None:
+        url_key = (url, variant)
+        content_key = cls._url_index.get(url_key)
+        if content_key:
+            data = cls._lookup_content(content_key)
+            if data is not None:
+                return data
+
+        task = cls._in_flight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(cls._process(url))
+            cls._in_flight[url] = task
+            task.add_done_callback(lambda _: cls._in_flight.pop(url, None))
+        variants = await asyncio.shield(task)
+        return variants.get(variant) if variants else None
+
+    @classmethod
+    async def _process(cls, url: str) -> dict[str, bytes] | None:
+        source = await download_image_to_bytes(url)
+        if not source:
+            return None
+
+        source_hash = hashlib.sha256(source).hexdigest()
+        variants = {
+            variant: cls._lookup_content((source_hash, variant))
+            for variant in IMAGE_VARIANTS
+        }
+        if None in variants.values():
+            try:
+                variants = await asyncio.get_running_loop().run_in_executor(
+                    cls._get_executor(), resize_to_variants, source
+                )
+            except Exception as e:
+                logging.warning(
+                    f"IMAGE_PROCESSOR: Could not build variants for {url}, using original. Error: {e}"
+                )
+                variants = {variant: source for variant in IMAGE_VARIANTS}
+
+        for variant, data in variants.items():
+            cls._store((url, variant), (source_hash, variant), data)
+        return variants
+
+    @classmethod
+    async def get_buffer(cls, url: str, variant: str) -> BufferedInputFile | None:
+        image_bytes = await cls.get_variant(url, variant)
+        if image_bytes:
+            return BufferedInputFile(image_bytes, filename="photo.jpg")
+        return None
@@ -2,16 +2,22 @@ import asyncio
 import json
 import logging
 import os
-import random
 import re
 from datetime import datetime, timezone
 
 from bs4 import BeautifulSoup
 from curl_cffi.requests import AsyncSession
 
-from app.core.settings import settings
-
+from .circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
+from .deadline import DeadlineExceededError
 from .filter_builder import KufarFilterBuilder
+from .http_client import hedged_request, request
+from .token_pool import kufar_token_pool
+
+KUFAR_PARAM_LABELS = ["Год", "Тип кузова", "Объем, л", "Тип двигателя", "Пробег, км"]
+KUFAR_DETAIL_FIELDS = ("title", "params", "description", "images")
+KUFAR_REQUIRED_FIELDS = ("title", "params")
+KUFAR_IMAGE_URL = "https://rms.kufar.by/v1/gallery/{path}"
 
 
 class KufarClient:
@@ -33,8 +39,13 @@ class KufarClient:
         params = {"tag": "category_2010", "view": "taxonomy", "with-content": "true"}
         try:
             async with AsyncSession(impersonate="chrome136") as session:
-                response = await session.get(
-                    self.nodes_url, params=params, headers=self.headers
+                response = await request(
+                    session,
+                    "GET",
+                    self.nodes_url,
+                    breaker="kufar:catalog",
+                    params=params,
+                    headers=self.headers,
                 )
                 response.raise_for_status()
                 return response.json()
@@ -48,8 +59,13 @@ class KufarClient:
         params = {"tag": brand_slug, "view": "taxonomy", "with-content": "true"}
         try:
             async with AsyncSession(impersonate="chrome136") as session:
-                response = await session.get(
-                    self.nodes_url, params=params, headers=self.headers
+                response = await request(
+                    session,
+                    "GET",
+                    self.nodes_url,
+                    breaker="kufar:catalog",
+                    params=params,
+                    headers=self.headers,
                 )
                 response.raise_for_status()
                 return response.json()
@@ -69,22 +85,9 @@ class KufarClient:
 
         try:
             async with AsyncSession(impersonate="chrome136") as session:
-                ad_raw = None
-                try:
-                    api_url = self.ad_public_api_url.format(ad_id=ad_id)
-                    response = await session.get(api_url, headers=self.headers)
-                    response.raise_for_status()
-                    ad_raw = response.json()
-                except Exception:
-                    logging.warning(
-                        f"KUFAR_CLIENT: API call failed for ad {ad_id}. Falling back to HTML parsing."
-                    )
-
-                page_response = await session.get(url, impersonate="chrome136")
-                page_response.raise_for_status()
-                soup = BeautifulSoup(page_response.text, "html.parser")
-
-                return await self.get_ad_details(session, ad_raw, soup, ad_id, url)
+                return await self.get_ad_details(
+                    session, None, ad_id_from_url=ad_id, ad_link_from_url=url
+                )
         except Exception as e:
             logging.error(
                 f"KUFAR_CLIENT: FAILED to get ad details for {url}. Error: {e}",
@@ -92,11 +95,143 @@ class KufarClient:
             )
             return None
 
+    async def _fetch_public_ad(self, session: AsyncSession, ad_id: str) -> dict:
+        try:
+            api_url = self.ad_public_api_url.format(ad_id=ad_id)
+            response = await request(
+                session,
+                "GET",
+                api_url,
+                breaker="kufar:details",
+                headers=self.headers,
+            )
+            response.raise_for_status()
+            return response.json() or {}
+        except Exception as e:
+            logging.warning(f"KUFAR_CLIENT: API call failed for ad {ad_id}. Error: {e}")
+            return {}
+
+    async def _fetch_ad_page(self, session: AsyncSession, ad_link: str):
+        page_response = await request(
+            session,
+            "GET",
+            ad_link,
+            breaker="kufar:details_page",
+            impersonate="chrome136",
+        )
+        page_response.raise_for_status()
+        return BeautifulSoup(page_response.text, "html.parser")
+
+    def _parse_api_fields(self, ad_json: dict) -> dict:
+        fields = {}
+
+        if ad_json.get("subject"):
+            fields["title"] = ad_json["subject"]
+
+        if ad_json.get("body"):
+            fields["description"] = ad_json["body"]
+
+        param_parts = []
+        for param in ad_json.get("ad_parameters") or []:
+            if param.get("pl") in KUFAR_PARAM_LABELS and param.get("vl"):
+                value = param["vl"]
+                param_parts.append(
+                    ", ".join(map(str, value)) if isinstance(value, list) else value
+                )
+        if param_parts:
+            fields["params"] = ", ".join(param_parts)
+
+        images = []
+        for image in ad_json.get("images") or []:
+            if isinstance(image, str):
+                images.append(image)
+            elif isinstance(image, dict) and image.get("path"):
+                images.append(KUFAR_IMAGE_URL.format(path=image["path"]))
+        if images:
+            fields["images"] = images[:10]
+
+        if ad_json.get("price_usd"):
+            fields["price_usd"] = int(ad_json["price_usd"]) // 100
+        if ad_json.get("price_byn"):
+            fields["price_byn"] = int(ad_json["price_byn"]) // 100
+
+        if ad_json.get("list_time"):
+            fields["published_at"] = datetime.fromisoformat(
+                ad_json["list_time"].replace("Z", "+00:00")
+            )
+
+        return fields
+
+    def _parse_page_fields(self, soup: BeautifulSoup) -> dict:
+        fields = {}
+
+        next_data_script = soup.find("script", id="__NEXT_DATA__")
+        if next_data_script:
+            data = json.loads(next_data_script.string)
+            ad_data_json = (
+                data.get("props", {})
+                .get("initialState", {})
+                .get("adView", {})
+                .get("data", {})
+            )
+        else:
+            ad_data_json = {}
+
+        if ad_data_json.get("adParams"):
+            param_parts = [
+                p["vl"]
+                for p in ad_data_json["adParams"].values()
+                if p["pl"] in KUFAR_PARAM_LABELS
+            ]
+            fields["params"] = ", ".join(filter(None, param_parts))
+
+        description = ad_data_json.get("body", "")
+        if not description:
+            desc_block = soup.find("div", attrs={"data-name": "description-block"})
+            if desc_block:
+                desc_content = desc_block.find(
+                    "div", class_=lambda x: x and "description_content" in x
+                )
+                if desc_content:
+                    description = desc_content.get_text(strip=True)
+        if description:
+            fields["description"] = description
+
+        images = ad_data_json.get("images", {}).get("gallery", [])[:10]
+        if images:
+            fields["images"] = images
+
+        if ad_data_json.get("subject"):
+            fields["title"] = ad_data_json["subject"]
+
+        if ad_data_json:
+            price_usd_str = ad_data_json.get("priceUsd", "0")
+            price_byn_str = ad_data_json.get("price", "0")
+            fields["price_usd"] = int("".join(filter(str.isdigit, price_usd_str)) or 0)
+            fields["price_byn"] = int("".join(filter(str.isdigit, price_byn_str)) or 0)
+        else:
+            price_usd_tag = soup.find("span", class_=lambda c: c and "secondary" in c)
+            price_byn_tag = soup.find("span", class_=lambda c: c and "main" in c)
+            if price_usd_tag:
+                fields["price_usd"] = int(
+                    "".join(filter(str.isdigit, price_usd_tag.get_text(strip=True)))
+                )
+            if price_byn_tag:
+                fields["price_byn"] = int(
+                    "".join(filter(str.isdigit, price_byn_tag.get_text(strip=True)))
+                )
+
+        if ad_data_json.get("date"):
+            fields["published_at"] = datetime.fromisoformat(
+                ad_data_json["date"].replace("Z", "+00:00")
+            )
+
+        return fields
+
     async def get_ad_details(
         self,
         session: AsyncSession,
         ad_raw: dict | None,
-        soup: BeautifulSoup | None = None,
         ad_id_from_url: str | None = None,
         ad_link_from_url: str | None = None,
     ):
@@ -107,108 +242,39 @@ class KufarClient:
             return None
 
         try:
-            if not soup:
-                await asyncio.sleep(random.uniform(0.5, 1.5))
-                page_response = await session.get(ad_link, impersonate="chrome136")
-                page_response.raise_for_status()
-                soup = BeautifulSoup(page_response.text, "html.parser")
-
-            next_data_script = soup.find("script", id="__NEXT_DATA__")
-            if next_data_script:
-                data = json.loads(next_data_script.string)
-                ad_data_json = (
-                    data.get("props", {})
-                    .get("initialState", {})
-                    .get("adView", {})
-                    .get("data", {})
-                )
-            else:
-                ad_data_json = {}
-
-            params_str = "Не удалось загрузить"
-            if ad_data_json.get("adParams"):
-                param_parts = [
-                    p["vl"]
-                    for p in ad_data_json["adParams"].values()
-                    if p["pl"]
-                    in ["Год", "Тип кузова", "Объем, л", "Тип двигателя", "Пробег, км"]
-                ]
-                params_str = ", ".join(filter(None, param_parts))
-
-            description = ad_data_json.get("body", "")
-            if not description:
-                desc_block = soup.find("div", attrs={"data-name": "description-block"})
-                if desc_block:
-                    desc_content = desc_block.find(
-                        "div", class_=lambda x: x and "description_content" in x
-                    )
-                    if desc_content:
-                        description = desc_content.get_text(strip=True)
-
-            phone_number = None
-            if settings.kufar_bearer_tokens:
-                token = random.choice(settings.kufar_bearer_tokens)
-                phone_url = f"https://api.kufar.by/search-api/v2/item/{ad_id}/phone"
-                headers = {
-                    "Authorization": f"Bearer {token}",
-                    "Origin": "https://auto.kufar.by",
-                    "Referer": ad_link,
-                }
-                await asyncio.sleep(random.uniform(0.5, 1.5))
-                phone_response = await session.get(
-                    phone_url, headers=headers, impersonate="chrome136"
-                )
-                if phone_response.status_code == 200:
-                    phone_number = phone_response.json().get("phone")
-
-            images = ad_data_json.get("images", {}).get("gallery", [])[:10]
-
-            title = ad_data_json.get("subject", "Нет заголовка")
-            price_usd = 0
-            price_byn = 0
-
-            if ad_raw:
-                price_usd = int(ad_raw.get("price_usd", 0)) // 100
-                price_byn = int(ad_raw.get("price_byn", 0)) // 100
-            elif ad_data_json:
-                price_usd_str = ad_data_json.get("priceUsd", "0")
-                price_byn_str = ad_data_json.get("price", "0")
-                price_usd = int("".join(filter(str.isdigit, price_usd_str)))
-                price_byn = int("".join(filter(str.isdigit, price_byn_str)))
-            else:
-                price_usd_tag = soup.find(
-                    "span", class_=lambda c: c and "secondary" in c
-                )
-                price_byn_tag = soup.find("span", class_=lambda c: c and "main" in c)
-                if price_usd_tag:
-                    price_usd = int(
-                        "".join(filter(str.isdigit, price_usd_tag.get_text(strip=True)))
-                    )
-                if price_byn_tag:
-                    price_byn = int(
-                        "".join(filter(str.isdigit, price_byn_tag.get_text(strip=True)))
-                    )
-
-            published_at_str = ad_data_json.get("date")
-            published_at = (
-                datetime.fromisoformat(published_at_str.replace("Z", "+00:00"))
-                if published_at_str
-                else datetime.now(timezone.utc)
-            )
+            fields = self._parse_api_fields(ad_raw) if ad_raw else {}
+
+            if any(field not in fields for field in KUFAR_DETAIL_FIELDS):
+                ad_json = await self._fetch_public_ad(session, ad_id)
+                for key, value in self._parse_api_fields(ad_json).items():
+                    fields.setdefault(key, value)
+
+                if any(field not in fields for field in KUFAR_REQUIRED_FIELDS):
+                    try:
+                        soup = await self._fetch_ad_page(session, ad_link)
+                        for key, value in self._parse_page_fields(soup).items():
+                            fields.setdefault(key, value)
+                    except Exception as e:
+                        logging.warning(
+                            f"KUFAR_CLIENT: Page fetch failed for ad {ad_id}, using listing fields. Error: {e}"
+                        )
+
+            if not fields:
+                return None
 
             return {
                 "url": ad_link,
                 "ad_id": ad_id,
                 "platform": "kufar",
-                "published_at": published_at,
+                "published_at": fields.get("published_at")
+                or datetime.now(timezone.utc),
                 "data": {
-                    "title": title,
-                    "price_usd": price_usd,
-                    "price_byn": price_byn,
-                    "images": images,
-                    "params": params_str,
-                    "description": description,
-                    "phone": phone_number,
+                    "title": fields.get("title", "Нет заголовка"),
+                    "price_usd": fields.get("price_usd", 0),
+                    "price_byn": fields.get("price_byn", 0),
+                    "images": fields.get("images", []),
+                    "params": fields.get("params", "Не удалось загрузить"),
+                    "description": fields.get("description", ""),
                 },
             }
         except Exception as e:
@@ -218,16 +284,66 @@ class KufarClient:
             )
             return None
 
+    async def get_phone(self, ad_id: str, ad_link: str) -> str | None:
+        token = kufar_token_pool.acquire()
+        if not token:
+            return None
+
+        phone_url = f"https://api.kufar.by/search-api/v2/item/{ad_id}/phone"
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Origin": "https://auto.kufar.by",
+            "Referer": ad_link,
+        }
+        status_code = None
+        try:
+            async with AsyncSession(impersonate="chrome136") as session:
+                response = await request(
+                    session,
+                    "GET",
+                    phone_url,
+                    breaker="kufar:phone",
+                    headers=headers,
+                )
+                status_code = response.status_code
+                if status_code == 200:
+                    return response.json().get("phone")
+                logging.warning(
+                    f"KUFAR_CLIENT: Phone request for ad {ad_id} returned {status_code}."
+                )
+        except Exception as e:
+            logging.error(
+                f"KUFAR_CLIENT: FAILED to get phone for ad {ad_id}. Error: {e}"
+            )
+        finally:
+            kufar_token_pool.report(token, status_code)
+        return None
+
     async def _fetch_ads_from_endpoint(self, session, url, api_params, headers):
         try:
-            response = await session.get(url, params=api_params, headers=headers)
+            response = await hedged_request(
+                session,
+                "GET",
+                url,
+                breaker="kufar:search",
+                params=api_params,
+                headers=headers,
+            )
             response.raise_for_status()
             return response.json().get("adverts") or response.json().get("ads", [])
+        except DeadlineExceededError:
+            raise
+        except CircuitOpenError as e:
+            logging.info(f"KUFAR_CLIENT: {e}")
+            return []
         except Exception as e:
             logging.error(f"KUFAR_CLIENT: Failed to fetch from {url}. Error: {e}")
             return []
 
-    async def find_ads_raw(self, params: dict):
+    def is_search_available(self) -> bool:
+        return not CircuitBreakerRegistry.is_open("kufar:search")
+
+    def _build_search_params(self, params: dict) -> dict:
         base_params = {
             "cat": "2010",
             "cur": "USD",
@@ -244,6 +360,40 @@ class KufarClient:
 
         filter_builder = KufarFilterBuilder(params.get("filters", {}))
         base_params.update(filter_builder.build())
+        return base_params
+
+    async def find_ads_page(self, params: dict, cursor: str | None = None):
+        api_params = {**self._build_search_params(params), "size": 40}
+        if cursor:
+            api_params["cursor"] = cursor
+
+        request_headers = self.headers.copy()
+        request_headers["x-searchid"] = os.urandom(18).hex()
+
+        async with AsyncSession(impersonate="chrome136") as session:
+            response = await request(
+                session,
+                "GET",
+                self.paginated_url,
+                breaker="kufar:search",
+                params=api_params,
+                headers=request_headers,
+            )
+            response.raise_for_status()
+
+        data = response.json()
+        next_cursor = next(
+            (
+                page.get("token")
+                for page in data.get("pagination", {}).get("pages", [])
+                if page.get("label") == "next"
+            ),
+            None,
+        )
+        return data.get("ads", []), next_cursor
+
+    async def find_ads_raw(self, params: dict):
+        base_params = self._build_search_params(params)
 
         request_headers = self.headers.copy()
         request_headers["x-searchid"] = os.urandom(18).hex()
@@ -274,6 +424,8 @@ class KufarClient:
                             unique_ads_raw[ad_id] = ad_data
 
                 return list(unique_ads_raw.values())
+        except DeadlineExceededError:
+            raise
         except Exception as e:
             logging.error(f"KUFAR_CLIENT: FAILED to get ads. Error: {e}", exc_info=True)
             return []
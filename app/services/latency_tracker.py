@@ -0,0 +1,34 @@
+from collections import deque
+
+from app.core.settings import settings
+
+
+class LatencyTracker:
+    _samples: dict[str, deque[float]] = {}
+
+    @classmethod
+    def record(cls, name: str, elapsed: float):
+        samples = cls._samples.get(name)
+        if samples is None:
+            samples = deque(maxlen=settings.hedge_window_size)
+            cls._samples[name] = samples
+        samples.append(elapsed)
+
+    @classmethod
+    def percentile(cls, name: str, percentile: float) -> float | None:
+        samples = cls._samples.get(name)
+        if not samples or len(samples) < settings.hedge_min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile))
+        return ordered[index]
+
+    @classmethod
+    def percentiles(cls) -> dict[str, dict[str, float]]:
+        result = {}
+        for name in cls._samples:
+            p50 = cls.percentile(name, 0.5)
+            p95 = cls.percentile(name, 0.95)
+            if p50 is not None and p95 is not None:
+                result[name] = {"p50": round(p50, 3), "p95": round(p95, 3)}
+        return result
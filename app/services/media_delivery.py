@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import re
+import time
+from urllib.parse import urlparse
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import (
+    BufferedInputFile,
+    InlineKeyboardMarkup,
+    InputMediaPhoto,
+    Message,
+)
+
+from app.core.settings import settings
+from app.services.image_processor import ImageProcessor
+
+URL_FETCH_ERRORS = (
+    "failed to get http url content",
+    "wrong file identifier/http url specified",
+    "wrong type of the web page content",
+    "webpage_curl_failed",
+    "webpage_media_empty",
+)
+MEDIA_INDEX_PATTERN = re.compile(r"message #(\d+)")
+
+
+class MediaHostPolicy:
+    _upload_hosts: dict[str, float] = {}
+
+    @classmethod
+    def needs_upload(cls, url: str) -> bool:
+        host = urlparse(url).hostname or ""
+        expires_at = cls._upload_hosts.get(host)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del cls._upload_hosts[host]
+            return False
+        return True
+
+    @classmethod
+    def mark_upload_required(cls, url: str):
+        host = urlparse(url).hostname or ""
+        if host not in cls._upload_hosts:
+            logging.info(
+                f"MEDIA: Telegram cannot fetch images from {host}, switching it to upload."
+            )
+        cls._upload_hosts[host] = (
+            time.monotonic() + settings.media_host_fallback_ttl_seconds
+        )
+
+
+def is_url_fetch_error(error: TelegramBadRequest) -> bool:
+    message = str(error).lower()
+    return any(pattern in message for pattern in URL_FETCH_ERRORS)
+
+
+async def resolve_media(url: str) -> str | BufferedInputFile | None:
+    if settings.media_delivery_mode == "upload" or MediaHostPolicy.needs_upload(url):
+        return await ImageProcessor.get_buffer(url, "telegram")
+    return url
+
+
+async def send_photo_with_fallback(
+    bot: Bot,
+    chat_id: int,
+    url: str,
+    caption: str | None = None,
+    reply_markup: InlineKeyboardMarkup | None = None,
+) -> Message | None:
+    media = await resolve_media(url)
+    if media is None:
+        return None
+
+    try:
+        return await bot.send_photo(
+            chat_id=chat_id, photo=media, caption=caption, reply_markup=reply_markup
+        )
+    except TelegramBadRequest as e:
+        if not isinstance(media, str) or not is_url_fetch_error(e):
+            raise
+        MediaHostPolicy.mark_upload_required(url)
+
+    buffer = await ImageProcessor.get_buffer(url, "telegram")
+    if not buffer:
+        return None
+    return await bot.send_photo(
+        chat_id=chat_id, photo=buffer, caption=caption, reply_markup=reply_markup
+    )
+
+
+async def send_media_group_with_fallback(
+    bot: Bot, chat_id: int, urls: list[str], caption: str | None = None
+) -> list[Message]:
+    sources = await asyncio.gather(*(resolve_media(url) for url in urls))
+    items = [(url, source) for url, source in zip(urls, sources) if source]
+
+    while True:
+        if not items:
+            return []
+        if len(items) == 1:
+            sent_message = await send_photo_with_fallback(
+                bot, chat_id, items[0][0], caption
+            )
+            return [sent_message] if sent_message else []
+
+        media_group = [
+            InputMediaPhoto(media=source, caption=caption if index == 0 else None)
+            for index, (_, source) in enumerate(items)
+        ]
+        try:
+            return await bot.send_media_group(chat_id=chat_id, media=media_group)
+        except TelegramBadRequest as e:
+            url_indexes = [
+                index
+                for index, (_, source) in enumerate(items)
+                if isinstance(source, str)
+            ]
+            if not url_indexes or not is_url_fetch_error(e):
+                raise
+
+            failed_indexes = url_indexes
+            match = MEDIA_INDEX_PATTERN.search(str(e))
+            if match and int(match.group(1)) - 1 in url_indexes:
+                failed_indexes = [int(match.group(1)) - 1]
+
+        for index in failed_indexes:
+            MediaHostPolicy.mark_upload_required(items[index][0])
+
+        buffers = await asyncio.gather(
+            *(
+                ImageProcessor.get_buffer(items[index][0], "telegram")
+                for index in failed_indexes
+            )
+        )
+        replacements = dict(zip(failed_indexes, buffers))
+        items = [
+            (url, replacements.get(index, source))
+            for index, (url, source) in enumerate(items)
+            if replacements.get(index, source)
+        ]
@@ -0,0 +1,45 @@
+import asyncio
+from collections import OrderedDict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db_queries import get_ad_by_ad_id, update_ad_data
+from app.services.kufar_client import KufarClient
+
+
+class PhoneRevealer:
+    _cache: OrderedDict[str, str] = OrderedDict()
+    _max_cache_size: int = 4096
+    _in_flight: dict[str, asyncio.Task] = {}
+
+    @classmethod
+    async def get_kufar_phone(cls, session: AsyncSession, ad_id: str) -> str | None:
+        if ad_id in cls._cache:
+            cls._cache.move_to_end(ad_id)
+            return cls._cache[ad_id]
+
+        ad = await get_ad_by_ad_id(session, "kufar", ad_id)
+        if not ad:
+            return None
+
+        if phone := (ad.data or {}).get("phone"):
+            cls._remember(ad_id, phone)
+            return phone
+
+        task = cls._in_flight.get(ad_id)
+        if task is None:
+            task = asyncio.ensure_future(KufarClient().get_phone(ad_id, ad.url))
+            cls._in_flight[ad_id] = task
+            task.add_done_callback(lambda _: cls._in_flight.pop(ad_id, None))
+        phone = await asyncio.shield(task)
+
+        if phone:
+            cls._remember(ad_id, phone)
+            await update_ad_data(session, ad.url, {**(ad.data or {}), "phone": phone})
+        return phone
+
+    @classmethod
+    def _remember(cls, ad_id: str, phone: str):
+        cls._cache[ad_id] = phone
+        if len(cls._cache) > cls._max_cache_size:
+            cls._cache.popitem(last=False)
@@ -0,0 +1,222 @@
+import asyncio
+import fnmatch
+import logging
+import time
+import weakref
+from dataclasses import asdict, dataclass
+from urllib.parse import urlparse
+
+from curl_cffi.requests import AsyncSession
+
+from app.core.settings import settings
+
+
+@dataclass
+class ProxyState:
+    url: str
+    in_flight: int = 0
+    consecutive_failures: int = 0
+    unhealthy_until: float = 0.0
+    requests: int = 0
+    successes: int = 0
+    failures: int = 0
+
+
+def proxy_label(proxy: str) -> str:
+    parsed = urlparse(proxy)
+    return f"{parsed.hostname}:{parsed.port}" if parsed.port else parsed.hostname or "?"
+
+
+def host_matches(host: str, pattern: str) -> bool:
+    if any(char in pattern for char in "*?["):
+        return fnmatch.fnmatch(host, pattern)
+    return host == pattern or host.endswith(f".{pattern}")
+
+
+class ProxyPool:
+    def __init__(self, pattern: str, proxies: list[str]):
+        self.pattern = pattern
+        self._states: dict[str, ProxyState] = {}
+        self.sync(proxies)
+
+    def sync(self, proxies: list[str]):
+        removed = set(self._states) - set(proxies)
+        for proxy in removed:
+            del self._states[proxy]
+        added = [proxy for proxy in proxies if proxy not in self._states]
+        for proxy in added:
+            self._states[proxy] = ProxyState(url=proxy)
+        if added or removed:
+            logging.info(
+                f"PROXY_POOL: {self.pattern} proxies reloaded: +{len(added)} / -{len(removed)}, {len(self._states)} total."
+            )
+
+    def is_healthy(self, proxy: str) -> bool:
+        state = self._states.get(proxy)
+        return bool(state) and state.unhealthy_until <= time.monotonic()
+
+    def acquire(self, preferred: str | None = None) -> str | None:
+        if not self._states:
+            return None
+
+        if preferred and self.is_healthy(preferred):
+            state = self._states[preferred]
+        else:
+            now = time.monotonic()
+            healthy = [s for s in self._states.values() if s.unhealthy_until <= now]
+            if healthy:
+                state = min(healthy, key=lambda s: (s.in_flight, s.requests))
+            else:
+                state = min(self._states.values(), key=lambda s: s.unhealthy_until)
+                logging.warning(
+                    f"PROXY_POOL: No healthy proxy for {self.pattern}, trying {proxy_label(state.url)} anyway."
+                )
+
+        state.in_flight += 1
+        state.requests += 1
+        return state.url
+
+    def release(self, proxy: str, ok: bool | None):
+        state = self._states.get(proxy)
+        if not state:
+            return
+
+        state.in_flight = max(0, state.in_flight - 1)
+        if ok is None:
+            return
+        if ok:
+            state.successes += 1
+            state.consecutive_failures = 0
+            return
+
+        state.failures += 1
+        state.consecutive_failures += 1
+        if state.consecutive_failures >= settings.proxy_failure_threshold:
+            self.mark_unhealthy(proxy)
+
+    def mark_unhealthy(self, proxy: str):
+        state = self._states.get(proxy)
+        if not state:
+            return
+        if state.unhealthy_until <= time.monotonic():
+            logging.warning(
+                f"PROXY_POOL: {proxy_label(proxy)} marked unhealthy for {self.pattern}."
+            )
+        state.unhealthy_until = time.monotonic() + settings.proxy_cooldown_seconds
+
+    def mark_healthy(self, proxy: str):
+        state = self._states.get(proxy)
+        if not state:
+            return
+        if state.unhealthy_until > time.monotonic():
+            logging.info(
+                f"PROXY_POOL: {proxy_label(proxy)} is healthy again for {self.pattern}."
+            )
+        state.unhealthy_until = 0.0
+        state.consecutive_failures = 0
+
+    def proxies(self) -> list[str]:
+        return list(self._states)
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        result = []
+        for state in self._states.values():
+            state_stats = asdict(state)
+            state_stats["url"] = proxy_label(state.url)
+            state_stats["healthy"] = state.unhealthy_until <= now
+            result.append(state_stats)
+        return result
+
+
+class ProxyRouter:
+    _pools: dict[str, ProxyPool] = {}
+    _sticky: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def sync(cls, routes: dict[str, list[str]]):
+        for pattern in set(cls._pools) - set(routes):
+            del cls._pools[pattern]
+        for pattern, proxies in routes.items():
+            if pattern in cls._pools:
+                cls._pools[pattern].sync(proxies)
+            else:
+                cls._pools[pattern] = ProxyPool(pattern, proxies)
+
+    @classmethod
+    def match(cls, url: str) -> ProxyPool | None:
+        host = urlparse(url).hostname or ""
+        matched = [
+            pool for pattern, pool in cls._pools.items() if host_matches(host, pattern)
+        ]
+        if not matched:
+            return None
+        return max(matched, key=lambda pool: len(pool.pattern.strip("*")))
+
+    @classmethod
+    def is_sticky(cls, url: str) -> bool:
+        host = urlparse(url).hostname or ""
+        return any(
+            host_matches(host, pattern) for pattern in settings.proxy_sticky_patterns
+        )
+
+    @classmethod
+    def acquire(cls, url: str, session=None) -> tuple[ProxyPool | None, str | None]:
+        pool = cls.match(url)
+        if pool is None:
+            return None, None
+
+        sticky = session is not None and cls.is_sticky(url)
+        preferred = cls._sticky.get(session) if sticky else None
+        proxy = pool.acquire(preferred)
+        if sticky and proxy:
+            cls._sticky[session] = proxy
+        return pool, proxy
+
+    @classmethod
+    def pools(cls) -> dict[str, ProxyPool]:
+        return dict(cls._pools)
+
+
+ProxyRouter.sync(settings.proxy_routes)
+
+
+async def probe_proxy(proxy: str) -> bool:
+    try:
+        async with AsyncSession(impersonate="chrome136") as session:
+            response = await session.get(
+                settings.proxy_health_check_url,
+                proxy=proxy,
+                timeout=settings.proxy_health_check_timeout_seconds,
+            )
+            return response.status_code < 500
+    except Exception as e:
+        logging.warning(
+            f"PROXY_POOL: Health check failed for {proxy_label(proxy)}. Error: {e}"
+        )
+        return False
+
+
+async def check_proxy_health():
+    pools = ProxyRouter.pools()
+    proxies = list({proxy for pool in pools.values() for proxy in pool.proxies()})
+    if not proxies:
+        return
+
+    results = dict(
+        zip(proxies, await asyncio.gather(*(probe_proxy(proxy) for proxy in proxies)))
+    )
+    for pool in pools.values():
+        for proxy in pool.proxies():
+            if results.get(proxy):
+                pool.mark_healthy(proxy)
+            else:
+                pool.mark_unhealthy(proxy)
+
+        for proxy_stats in pool.stats():
+            logging.info(
+                "PROXY_POOL: {pattern} {url}: requests={requests}, successes={successes}, "
+                "failures={failures}, in_flight={in_flight}, healthy={healthy}".format(
+                    pattern=pool.pattern, **proxy_stats
+                )
+            )
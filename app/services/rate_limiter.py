@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import time
+from urllib.parse import urlparse
+
+from app.core.settings import settings
+
+CHALLENGE_MARKERS = (
+    "challenge-platform",
+    "cf-chl",
+    "ddos-guard",
+    "<title>just a moment",
+)
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, host: str):
+        self.host = host
+        self.rate = settings.rate_limit_initial_rps
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + 1 / self.rate
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        self.rate = min(
+            settings.rate_limit_max_rps,
+            self.rate + settings.rate_limit_increase_rps,
+        )
+
+    def on_throttle(self, reason: str):
+        previous_rate = self.rate
+        self.rate = max(
+            settings.rate_limit_min_rps,
+            self.rate * settings.rate_limit_decrease_factor,
+        )
+        self._next_slot = max(self._next_slot, time.monotonic() + 1 / self.rate)
+        logging.warning(
+            f"RATE_LIMITER: {self.host} throttled ({reason}), rate {previous_rate:.2f} -> {self.rate:.2f} rps."
+        )
+
+
+class RateLimiterRegistry:
+    _limiters: dict[str, AdaptiveRateLimiter] = {}
+
+    @classmethod
+    def get(cls, url: str, egress: str | None = None) -> AdaptiveRateLimiter:
+        host = urlparse(url).hostname or ""
+        key = f"{host} via {egress}" if egress else host
+        limiter = cls._limiters.get(key)
+        if limiter is None:
+            limiter = AdaptiveRateLimiter(key)
+            cls._limiters[key] = limiter
+        return limiter
+
+    @classmethod
+    def rates(cls) -> dict[str, float]:
+        return {host: round(limiter.rate, 2) for host, limiter in cls._limiters.items()}
+
+
+def is_challenge_page(response) -> bool:
+    content_type = response.headers.get("content-type") or ""
+    if "text/html" not in content_type:
+        return False
+    head = response.text[:4096].lower()
+    return any(marker in head for marker in CHALLENGE_MARKERS)
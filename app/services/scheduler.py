@@ -3,299 +3,350 @@ import logging
 from datetime import datetime, timezone
 
 from aiogram import Bot
-from aiogram.enums import ChatAction
-from aiogram.exceptions import TelegramAPIError
-from aiogram.types import InputMediaPhoto, Message
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from curl_cffi.requests import AsyncSession as AsyncRequestsSession
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.bot.utils.message_splitter import send_long_message
 from app.core.db_queries import (
     add_new_ads,
-    get_active_searches,
-    get_subscriptions_by_search_hash,
-    mark_ads_as_sent,
+    claim_searches,
+    get_existing_ad_urls,
+    release_search_leases,
+    update_search_catch_up,
     update_search_last_checked,
 )
 from app.core.settings import settings
 from app.services.av_client import AvClient
-from app.services.gemini_client import analyze_ad
+from app.services.catalog import BrandCatalog
+from app.services.circuit_breaker import CircuitBreakerRegistry
+from app.services.deadline import (
+    DeadlineExceededError,
+    deadline,
+    is_expired,
+    remaining,
+)
+from app.services.delivery import drain_outbox
 from app.services.kufar_client import KufarClient
-from app.utils.image_downloader import download_image_to_buffer
+from app.services.latency_tracker import LatencyTracker
+from app.services.proxy_pool import check_proxy_health
+from app.services.rate_limiter import RateLimiterRegistry
+from app.services.token_pool import reload_kufar_tokens
 
+CATCH_UP_OUTBOX_PRIORITY = 1
 
-async def process_search(search, session: AsyncSession, bot_start_time: datetime):
-    last_checked_from_db = search.last_checked_at
-    last_checked_aware = None
 
-    if last_checked_from_db:
-        if last_checked_from_db.tzinfo is None:
-            last_checked_aware = last_checked_from_db.replace(tzinfo=timezone.utc)
-        else:
-            last_checked_aware = last_checked_from_db
+def as_utc(value: datetime | None) -> datetime | None:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
 
-    cutoff_time = (
-        max(last_checked_aware, bot_start_time)
-        if last_checked_aware
-        else bot_start_time
-    )
 
-    if search.platform == "av":
-        client = AvClient()
-        params = {
-            k: v
-            for k, v in search.search_params.items()
-            if not k.endswith(("_name", "_slug"))
-        }
-        found_ads = await client.find_ads(params)
-
-        truly_new_ads = [
-            ad
-            for ad in found_ads
-            if ad.get("published_at") and ad["published_at"] > cutoff_time
-        ]
+def in_window(published_at: datetime, since: datetime, until: datetime | None):
+    return published_at > since and (until is None or published_at <= until)
 
-        if not truly_new_ads:
-            return []
 
-        new_ads_in_db = await add_new_ads(session, truly_new_ads)
-        return new_ads_in_db
+def get_search_params(search) -> dict:
+    suffixes = ("_name", "_slug") if search.platform == "av" else ("_name", "_id")
+    return {k: v for k, v in search.search_params.items() if not k.endswith(suffixes)}
 
-    elif search.platform == "kufar":
-        client = KufarClient()
-        params = {
-            k: v
-            for k, v in search.search_params.items()
-            if not k.endswith(("_name", "_id"))
-        }
-        found_ads_raw = await client.find_ads_raw(params)
-        if not found_ads_raw:
-            return []
 
-        ads_to_process = []
-        for ad in found_ads_raw:
-            list_time_str = ad.get("list_time")
-            if not list_time_str:
-                continue
-
-            published_at = datetime.fromisoformat(list_time_str.replace("Z", "+00:00"))
-
-            if published_at > cutoff_time:
-                ads_to_process.append(
-                    {
-                        "raw_data": ad,
-                        "parsed_data": {
-                            "url": ad.get("ad_link"),
-                            "ad_id": str(ad.get("ad_id")),
-                            "platform": "kufar",
-                            "published_at": published_at,
-                            "data": {},
-                        },
-                    }
-                )
+def get_kufar_published_at(ad: dict) -> datetime | None:
+    list_time_str = ad.get("list_time")
+    if not list_time_str:
+        return None
+    return datetime.fromisoformat(list_time_str.replace("Z", "+00:00"))
 
-        if not ads_to_process:
-            return []
 
-        ads_to_check_in_db = [item["parsed_data"] for item in ads_to_process]
-        newly_inserted_ads = await add_new_ads(session, ads_to_check_in_db)
+async def save_av_ads(
+    search,
+    session: AsyncSession,
+    found_ads: list[dict],
+    since: datetime,
+    until: datetime | None = None,
+    priority: int = 0,
+):
+    truly_new_ads = [
+        ad
+        for ad in found_ads
+        if ad.get("published_at") and in_window(ad["published_at"], since, until)
+    ]
 
-        if not newly_inserted_ads:
-            return []
+    if not truly_new_ads:
+        return []
 
-        new_ads_urls = {ad["url"] for ad in newly_inserted_ads}
-        new_ads_raw_to_detail = [
-            item["raw_data"]
-            for item in ads_to_process
-            if item["parsed_data"]["url"] in new_ads_urls
-        ]
+    return await add_new_ads(session, search.search_hash, truly_new_ads, priority)
 
-        detailed_ads = []
-        async with AsyncRequestsSession(impersonate="chrome110") as detail_session:
-            for raw_ad in new_ads_raw_to_detail:
-                full_ad_data = await client.get_ad_details(detail_session, raw_ad)
-                if full_ad_data:
-                    detailed_ads.append(full_ad_data)
-        return detailed_ads
 
-    return []
+async def save_kufar_ads(
+    search,
+    session: AsyncSession,
+    client: KufarClient,
+    found_ads_raw: list[dict],
+    since: datetime,
+    until: datetime | None = None,
+    priority: int = 0,
+):
+    ads_to_process = []
+    for ad in found_ads_raw:
+        published_at = get_kufar_published_at(ad)
+        if not published_at or not ad.get("ad_link"):
+            continue
 
+        if in_window(published_at, since, until):
+            ads_to_process.append(ad)
 
-async def send_ad_to_user(bot: Bot, user_id: int, ad: dict) -> Message | None:
-    data = ad["data"]
-    price = f"≈ ${data.get('price_usd', 0)} / {data.get('price_byn', 0)} р."
+    if not ads_to_process:
+        return []
 
-    description_snippet = data.get("description") or ""
-    if len(description_snippet) > 300:
-        description_snippet = description_snippet[:300] + "..."
+    existing_urls = await get_existing_ad_urls(
+        session, [ad["ad_link"] for ad in ads_to_process]
+    )
+    new_ads_raw_to_detail = [
+        ad for ad in ads_to_process if ad["ad_link"] not in existing_urls
+    ]
+
+    if not new_ads_raw_to_detail:
+        return []
 
-    published_at_str = (
-        ad["published_at"]
-        .astimezone(datetime.now().astimezone().tzinfo)
-        .strftime("%H:%M, %d.%m")
+    detailed_ads = []
+    async with AsyncRequestsSession(impersonate="chrome110") as detail_session:
+        for raw_ad in new_ads_raw_to_detail:
+            if is_expired(settings.request_min_timeout_seconds):
+                break
+            full_ad_data = await client.get_ad_details(detail_session, raw_ad)
+            if full_ad_data:
+                detailed_ads.append(full_ad_data)
+
+    new_ads_in_db = await add_new_ads(
+        session, search.search_hash, detailed_ads, priority
     )
+    if is_expired(settings.request_min_timeout_seconds):
+        raise DeadlineExceededError(
+            f"Deadline exceeded after detailing {len(detailed_ads)} of {len(new_ads_raw_to_detail)} ads"
+        )
+    return new_ads_in_db
 
-    title = data.get("title", "Без названия").replace("\n", " ").strip()
-    platform_name = ad["platform"].upper()
-    linked_title = f'<a href="{ad["url"]}">{title}</a>'
 
-    caption_parts = [
-        f"<b>{platform_name}: {linked_title}</b>\n",
-        f"<b>Цена:</b> {price}",
-        f"<b>Параметры:</b> {data.get('params', 'Нет данных')}",
-        f"<b>Опубликовано:</b> {published_at_str}",
-    ]
+async def process_search(search, session: AsyncSession, bot_start_time: datetime):
+    last_checked_aware = as_utc(search.last_checked_at)
 
-    if phone := data.get("phone"):
-        caption_parts.append(f"<b>Телефон:</b> <code>{phone}</code>")
+    cutoff_time = (
+        max(last_checked_aware, bot_start_time)
+        if last_checked_aware
+        else bot_start_time
+    )
 
-    if description_snippet:
-        caption_parts.append(f"\n<i>{description_snippet}</i>")
+    if search.platform == "av":
+        found_ads = await AvClient().find_ads(get_search_params(search))
+        return await save_av_ads(search, session, found_ads, cutoff_time)
 
-    caption = "\n".join(caption_parts)
+    elif search.platform == "kufar":
+        client = KufarClient()
+        found_ads_raw = await client.find_ads_raw(get_search_params(search))
+        if not found_ads_raw:
+            return []
+        return await save_kufar_ads(search, session, client, found_ads_raw, cutoff_time)
 
-    image_urls = data.get("images", [])
+    return []
 
-    if not image_urls:
-        return await bot.send_message(
-            chat_id=user_id, text=caption, disable_web_page_preview=True
-        )
 
-    first_image_buffer = await download_image_to_buffer(image_urls[0])
-    if not first_image_buffer:
-        return await bot.send_message(
-            chat_id=user_id, text=caption, disable_web_page_preview=True
-        )
+async def catch_up_search(search, session: AsyncSession):
+    since = as_utc(search.catchup_from)
+    until = as_utc(search.catchup_until)
+    params = get_search_params(search)
 
-    if len(image_urls) == 1:
-        return await bot.send_photo(
-            chat_id=user_id,
-            photo=first_image_buffer,
-            caption=caption,
+    if search.platform == "av":
+        page = int(search.catchup_cursor or 1)
+        found_ads = await AvClient().find_ads(params, page=page)
+        next_cursor = str(page + 1) if found_ads else None
+        published = [ad["published_at"] for ad in found_ads if ad.get("published_at")]
+        new_ads = await save_av_ads(
+            search, session, found_ads, since, until, CATCH_UP_OUTBOX_PRIORITY
+        )
+    elif search.platform == "kufar":
+        client = KufarClient()
+        found_ads_raw, next_cursor = await client.find_ads_page(
+            params, search.catchup_cursor
+        )
+        published = [
+            published_at
+            for published_at in map(get_kufar_published_at, found_ads_raw)
+            if published_at
+        ]
+        new_ads = await save_kufar_ads(
+            search,
+            session,
+            client,
+            found_ads_raw,
+            since,
+            until,
+            CATCH_UP_OUTBOX_PRIORITY,
         )
     else:
-        media_group = [InputMediaPhoto(media=first_image_buffer, caption=caption)]
+        next_cursor, published, new_ads = None, [], []
+
+    pages = search.catchup_pages + 1
+    done = (
+        not next_cursor
+        or not published
+        or min(published) <= since
+        or pages >= settings.catch_up_max_pages
+    )
+    await update_search_catch_up(session, search.search_hash, next_cursor, pages, done)
+    if done:
+        logging.info(
+            f"CATCH_UP: Finished search {search.search_hash} after {pages} pages."
+        )
+    return new_ads
+
+
+async def run_catch_up(searches, session_maker: async_sessionmaker) -> int:
+    caught_up = 0
+    for search in searches:
+        if search.catchup_until is None or not is_platform_available(search.platform):
+            continue
+        if is_expired(settings.request_min_timeout_seconds):
+            break
+        try:
+            async with session_maker() as search_session:
+                new_ads = await asyncio.wait_for(
+                    catch_up_search(search, search_session),
+                    timeout=max(remaining(), 0),
+                )
+            caught_up += len(new_ads)
+        except (DeadlineExceededError, asyncio.TimeoutError):
+            break
+        except Exception as e:
+            logging.error(
+                f"CATCH_UP: Error backfilling search {search.search_hash}: {e}"
+            )
+    return caught_up
 
-        tasks = [download_image_to_buffer(url) for url in image_urls[1:10]]
-        remaining_images = await asyncio.gather(*tasks)
 
-        for img_buffer in remaining_images:
-            if img_buffer:
-                media_group.append(InputMediaPhoto(media=img_buffer))
+def is_platform_available(platform: str) -> bool:
+    if platform == "av":
+        return AvClient().is_search_available()
+    if platform == "kufar":
+        return KufarClient().is_search_available()
+    return True
 
-        if len(media_group) == 1:
-            return await bot.send_photo(
-                chat_id=user_id,
-                photo=first_image_buffer,
-                caption=caption,
-            )
-        else:
-            sent_messages = await bot.send_media_group(
-                chat_id=user_id, media=media_group
-            )
-            return sent_messages[0] if sent_messages else None
 
+def order_searches(searches, carry_over: list[str]):
+    carried = {search_hash: index for index, search_hash in enumerate(carry_over)}
+    return sorted(
+        searches,
+        key=lambda search: (
+            search.search_hash not in carried,
+            carried.get(search.search_hash, 0),
+        ),
+    )
 
-async def send_notifications(
-    bot: Bot, session: AsyncSession, search_hash: str, new_ads: list[dict]
-):
-    if not new_ads:
-        return
-
-    subscriptions = await get_subscriptions_by_search_hash(session, search_hash)
-
-    for sub in subscriptions:
-        sent_ad_urls = []
-        for ad in new_ads:
-            sent_message = None
-            try:
-                sent_message = await send_ad_to_user(bot, sub.user_id, ad)
-                sent_ad_urls.append(ad["url"])
-                await asyncio.sleep(1)
-            except TelegramAPIError as e:
-                if "message is not modified" in str(e):
-                    logging.warning(
-                        f"Ad {ad.get('url')} was already sent to {sub.user_id}. Marking as sent."
-                    )
-                    sent_ad_urls.append(ad["url"])
-                else:
-                    logging.error(
-                        f"Failed to send ad {ad.get('url')} to {sub.user_id}: {e}"
-                    )
 
-                if "bot was blocked by the user" in str(e):
-                    logging.warning(
-                        f"User {sub.user_id} blocked the bot. Deactivating subscriptions might be needed."
-                    )
-                    break
-                continue
-            except Exception as e:
-                logging.error(
-                    f"An unexpected error occurred while sending ad {ad.get('url')} to {sub.user_id}: {e}"
-                )
+async def check_for_updates(
+    session_maker: async_sessionmaker,
+    bot_start_time: datetime,
+    worker_id: str,
+    carry_over: list[str] | None = None,
+) -> list[str]:
+    logging.info("Scheduler job started: Checking for updates...")
+    deferred: list[str] = []
+    skipped_searches = 0
+    with deadline(settings.tick_budget_seconds):
+        async with session_maker() as session:
+            claimed_searches = await claim_searches(
+                session,
+                worker_id,
+                settings.crawler_batch_size,
+                settings.search_lease_seconds,
+            )
+            active_searches = order_searches(claimed_searches, carry_over or [])
 
-            if (
-                sent_message
-                and sub.user.ai_analysis_enabled
-                and settings.gemini_api_key
-            ):
+            for index, search in enumerate(active_searches):
+                if is_expired():
+                    deferred = [s.search_hash for s in active_searches[index:]]
+                    break
+                if not is_platform_available(search.platform):
+                    skipped_searches += 1
+                    continue
                 try:
-                    await bot.send_chat_action(sub.user_id, ChatAction.TYPING)
-                    full_ad_data = ad
-                    if ad["platform"] == "av":
-                        av_client = AvClient()
-                        detailed_data = await av_client.get_ad_details(ad["url"])
-                        if detailed_data:
-                            full_ad_data = detailed_data
-
-                    analysis = await analyze_ad(full_ad_data)
-                    if analysis:
-                        await send_long_message(
-                            bot,
-                            sub.user_id,
-                            analysis,
-                            reply_to_message_id=sent_message.message_id,
+                    async with session_maker() as search_session:
+                        new_ads = await asyncio.wait_for(
+                            process_search(search, search_session, bot_start_time),
+                            timeout=max(remaining(), 0),
+                        )
+                        if new_ads:
+                            logging.info(
+                                f"Queued {len(new_ads)} new ads for search {search.search_hash}."
+                            )
+                        await update_search_last_checked(
+                            search_session, search.search_hash
                         )
-                        await asyncio.sleep(1)
+                except (DeadlineExceededError, asyncio.TimeoutError):
+                    deferred = [s.search_hash for s in active_searches[index:]]
+                    break
                 except Exception as e:
-                    logging.error(
-                        f"Failed to send AI analysis for ad {ad.get('url')} to {sub.user_id}: {e}"
-                    )
-
-        if sent_ad_urls:
-            await mark_ads_as_sent(session, sub.id, sent_ad_urls)
-
+                    logging.error(f"Error processing search {search.search_hash}: {e}")
 
-async def check_for_updates(
-    bot: Bot, session_maker: async_sessionmaker, bot_start_time: datetime
-):
-    logging.info("Scheduler job started: Checking for updates...")
-    async with session_maker() as session:
-        active_searches = await get_active_searches(session)
+            if settings.catch_up_enabled and not deferred:
+                caught_up = await run_catch_up(active_searches, session_maker)
+                if caught_up:
+                    logging.info(
+                        f"CATCH_UP: Queued {caught_up} missed ads at low priority."
+                    )
 
-        for search in active_searches:
-            try:
-                new_ads = await process_search(search, session, bot_start_time)
-                if new_ads:
-                    await send_notifications(bot, session, search.search_hash, new_ads)
-                await update_search_last_checked(session, search.search_hash)
-            except Exception as e:
-                logging.error(f"Error processing search {search.search_hash}: {e}")
-            finally:
-                await asyncio.sleep(2)
+            finished = [
+                search.search_hash
+                for search in active_searches
+                if search.search_hash not in deferred
+            ]
+            await release_search_leases(session, worker_id, finished)
+
+    if deferred:
+        logging.warning(
+            f"Tick budget of {settings.tick_budget_seconds}s exhausted, "
+            f"{len(deferred)} searches carried over to the next tick."
+        )
 
-    logging.info("Scheduler job finished.")
+    open_circuits = {
+        name: state
+        for name, state in CircuitBreakerRegistry.states().items()
+        if state != "closed"
+    }
+    if skipped_searches or open_circuits:
+        logging.warning(
+            f"Skipped {skipped_searches} searches with open circuits. Circuit states: {open_circuits}"
+        )
+    logging.info(
+        f"Scheduler job finished. Latency percentiles: {LatencyTracker.percentiles()}. "
+        f"Request rates: {RateLimiterRegistry.rates()}"
+    )
+    return deferred
 
 
 async def setup_scheduler(
     bot: Bot, session_maker: async_sessionmaker, bot_start_time: datetime
 ):
     scheduler = AsyncIOScheduler(timezone="Europe/Minsk")
+    if settings.embedded_delivery:
+        scheduler.add_job(
+            drain_outbox,
+            "interval",
+            seconds=settings.outbox_poll_interval_seconds,
+            args=(bot, session_maker),
+        )
+    scheduler.add_job(
+        check_proxy_health,
+        "interval",
+        seconds=settings.proxy_health_check_interval_seconds,
+    )
+    scheduler.add_job(
+        reload_kufar_tokens,
+        "interval",
+        seconds=settings.token_reload_interval_seconds,
+    )
     scheduler.add_job(
-        check_for_updates,
+        BrandCatalog.refresh,
         "interval",
-        seconds=settings.scheduler_interval_seconds,
-        args=(bot, session_maker, bot_start_time),
+        seconds=settings.catalog_refresh_interval_seconds,
     )
     return scheduler
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.db_queries import release_search_leases, schedule_catch_up
+from app.core.settings import settings
+from app.services.scheduler import check_for_updates
+
+
+def get_worker_id(role: str) -> str:
+    return settings.crawler_worker_id or f"{role}-{socket.gethostname()}-{os.getpid()}"
+
+
+class TickController:
+    def __init__(
+        self,
+        session_maker: async_sessionmaker,
+        bot_start_time: datetime,
+        worker_id: str,
+    ):
+        self.session_maker = session_maker
+        self.bot_start_time = bot_start_time
+        self.worker_id = worker_id
+        self.interval = settings.scheduler_interval_seconds
+        self.carry_over: list[str] = []
+        self.ticks = 0
+        self.missed_intervals = 0
+        self.last_duration = 0.0
+        self.last_lag = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        try:
+            async with self.session_maker() as session:
+                await release_search_leases(session, self.worker_id)
+        except Exception as e:
+            logging.error(
+                f"TICK_CONTROLLER: Failed to release leases of {self.worker_id}. Error: {e}"
+            )
+
+    async def _schedule_catch_up(self):
+        if not settings.catch_up_enabled:
+            return
+        try:
+            async with self.session_maker() as session:
+                scheduled = await schedule_catch_up(
+                    session, self.bot_start_time, settings.catch_up_max_window_seconds
+                )
+        except Exception as e:
+            logging.error(f"TICK_CONTROLLER: Failed to schedule catch-up. Error: {e}")
+            return
+        if scheduled:
+            logging.info(
+                f"TICK_CONTROLLER: Scheduled catch-up for {scheduled} searches missed while down."
+            )
+
+    async def _run(self):
+        await self._schedule_catch_up()
+        scheduled_at = time.monotonic() + self.interval
+        while True:
+            await asyncio.sleep(max(0.0, scheduled_at - time.monotonic()))
+            started_at = time.monotonic()
+            await self._tick()
+            finished_at = time.monotonic()
+
+            missed = int((finished_at - scheduled_at) // self.interval)
+            self.ticks += 1
+            self.last_lag = started_at - scheduled_at
+            self.last_duration = finished_at - started_at
+            self.missed_intervals += missed
+            scheduled_at += (missed + 1) * self.interval
+
+            logging.info(
+                f"TICK_CONTROLLER: Tick #{self.ticks} finished. Lag metrics: {self.stats()}"
+            )
+            if missed:
+                logging.warning(
+                    f"TICK_CONTROLLER: Tick #{self.ticks} overran the {self.interval}s interval, "
+                    f"{missed} runs missed ({self.missed_intervals} in total)."
+                )
+
+    async def _tick(self):
+        try:
+            self.carry_over = await check_for_updates(
+                self.session_maker,
+                self.bot_start_time,
+                self.worker_id,
+                self.carry_over,
+            )
+        except Exception as e:
+            logging.error(
+                f"TICK_CONTROLLER: Tick failed, keeping {len(self.carry_over)} carried over searches. Error: {e}",
+                exc_info=True,
+            )
+
+    def stats(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "missed_intervals": self.missed_intervals,
+            "last_duration": round(self.last_duration, 3),
+            "last_lag": round(self.last_lag, 3),
+            "carry_over": len(self.carry_over),
+        }
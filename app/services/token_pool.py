@@ -0,0 +1,118 @@
+import logging
+import time
+from dataclasses import asdict, dataclass
+
+from app.core.settings import Settings, settings
+
+
+@dataclass
+class TokenState:
+    token: str
+    last_used_at: float = 0.0
+    window_started_at: float = 0.0
+    window_requests: int = 0
+    quarantined_until: float = 0.0
+    requests: int = 0
+    successes: int = 0
+    failures: int = 0
+    quarantines: int = 0
+
+
+class BearerTokenPool:
+    def __init__(self, name: str, tokens: list[str]):
+        self.name = name
+        self._states: dict[str, TokenState] = {}
+        self.sync(tokens)
+
+    def sync(self, tokens: list[str]):
+        removed = set(self._states) - set(tokens)
+        for token in removed:
+            del self._states[token]
+        added = [token for token in tokens if token not in self._states]
+        for token in added:
+            self._states[token] = TokenState(token=token)
+        if added or removed:
+            logging.info(
+                f"TOKEN_POOL: {self.name} tokens reloaded: +{len(added)} / -{len(removed)}, {len(self._states)} total."
+            )
+
+    def acquire(self) -> str | None:
+        now = time.monotonic()
+        available = []
+        for state in self._states.values():
+            if state.quarantined_until > now:
+                continue
+            if now - state.window_started_at >= 60:
+                state.window_started_at = now
+                state.window_requests = 0
+            if state.window_requests >= settings.kufar_token_requests_per_minute:
+                continue
+            available.append(state)
+
+        if not available:
+            logging.warning(f"TOKEN_POOL: No {self.name} token is available right now.")
+            return None
+
+        state = min(available, key=lambda s: s.last_used_at)
+        state.last_used_at = now
+        state.window_requests += 1
+        state.requests += 1
+        return state.token
+
+    def report(self, token: str, status_code: int | None):
+        state = self._states.get(token)
+        if not state:
+            return
+
+        if status_code is not None and 200 <= status_code < 300:
+            state.successes += 1
+            return
+
+        state.failures += 1
+        if status_code in (401, 403):
+            cooldown = settings.kufar_token_auth_cooldown_seconds
+        elif status_code == 429:
+            cooldown = settings.kufar_token_rate_limit_cooldown_seconds
+        else:
+            return
+
+        state.quarantined_until = time.monotonic() + cooldown
+        state.quarantines += 1
+        logging.warning(
+            f"TOKEN_POOL: {self.name} token {self._mask(token)} got {status_code}, quarantined for {cooldown}s."
+        )
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        result = []
+        for state in self._states.values():
+            state_stats = asdict(state)
+            state_stats["token"] = self._mask(state.token)
+            state_stats["quarantined"] = state.quarantined_until > now
+            result.append(state_stats)
+        return result
+
+    @staticmethod
+    def _mask(token: str) -> str:
+        return f"...{token[-6:]}" if len(token) > 6 else "***"
+
+
+kufar_token_pool = BearerTokenPool("kufar", settings.kufar_bearer_tokens)
+
+
+async def reload_kufar_tokens():
+    try:
+        fresh_tokens = Settings().kufar_bearer_tokens
+    except Exception as e:
+        logging.error(f"TOKEN_POOL: Failed to reload settings. Error: {e}")
+        return
+
+    settings.kufar_bearer_tokens = fresh_tokens
+    kufar_token_pool.sync(fresh_tokens)
+    for token_stats in kufar_token_pool.stats():
+        logging.info(
+            "TOKEN_POOL: kufar {token}: requests={requests}, successes={successes}, "
+            "failures={failures}, quarantines={quarantines}, quarantined={quarantined}".format(
+                **token_stats
+            )
+        )
@@ -0,0 +1,66 @@
+import time
+from collections import OrderedDict
+
+from aiogram.types import User as TelegramUser
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db_queries import get_or_create_user, get_user, toggle_ai_analysis
+from app.core.settings import settings
+
+
+class UserCache:
+    _profiles: OrderedDict[int, tuple[bool, float]] = OrderedDict()
+
+    @classmethod
+    def _get(cls, user_id: int) -> bool | None:
+        entry = cls._profiles.get(user_id)
+        if entry is None:
+            return None
+        ai_enabled, cached_at = entry
+        if time.monotonic() - cached_at > settings.user_cache_ttl_seconds:
+            del cls._profiles[user_id]
+            return None
+        cls._profiles.move_to_end(user_id)
+        return ai_enabled
+
+    @classmethod
+    def _set(cls, user_id: int, ai_enabled: bool):
+        cls._profiles[user_id] = (ai_enabled, time.monotonic())
+        cls._profiles.move_to_end(user_id)
+        while len(cls._profiles) > settings.user_cache_size:
+            cls._profiles.popitem(last=False)
+
+    @classmethod
+    async def get_ai_enabled(
+        cls, session: AsyncSession, telegram_user: TelegramUser
+    ) -> bool:
+        cached = cls._get(telegram_user.id)
+        if cached is not None:
+            return cached
+
+        user = await get_user(session, telegram_user.id)
+        if user is None:
+            await get_or_create_user(
+                session,
+                user_id=telegram_user.id,
+                username=telegram_user.username,
+                first_name=telegram_user.first_name,
+            )
+            ai_enabled = False
+        else:
+            ai_enabled = user.ai_analysis_enabled
+        cls._set(telegram_user.id, ai_enabled)
+        return ai_enabled
+
+    @classmethod
+    async def ensure_user(cls, session: AsyncSession, telegram_user: TelegramUser):
+        await cls.get_ai_enabled(session, telegram_user)
+
+    @classmethod
+    async def toggle_ai_enabled(
+        cls, session: AsyncSession, telegram_user: TelegramUser
+    ) -> bool:
+        await cls.ensure_user(session, telegram_user)
+        ai_enabled = await toggle_ai_analysis(session, telegram_user.id)
+        cls._set(telegram_user.id, ai_enabled)
+        return ai_enabled
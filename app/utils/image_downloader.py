@@ -1,16 +1,69 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 
 from aiogram.types import BufferedInputFile
 from curl_cffi.requests import AsyncSession
 
+from app.core.settings import settings
+from app.services.http_client import request
+
+
+class ImageMemoryBudget:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.available = capacity
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def reserve(self, amount: int):
+        amount = min(amount, self.capacity)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.available >= amount)
+            self.available -= amount
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.available += amount
+                self._condition.notify_all()
+
+
+image_memory_budget = ImageMemoryBudget(settings.image_memory_budget_bytes)
+
 
 async def download_image_to_bytes(url: str) -> bytes | None:
+    max_bytes = settings.image_max_bytes
     try:
         async with AsyncSession(impersonate="chrome136") as session:
             headers = {"referer": "https://cars.av.by/"}
-            response = await session.get(url, timeout=15, headers=headers)
-            response.raise_for_status()
-            return response.content
+            response = await request(
+                session, "GET", url, timeout=15, headers=headers, stream=True
+            )
+            try:
+                response.raise_for_status()
+
+                content_length = int(response.headers.get("content-length") or 0)
+                if content_length > max_bytes:
+                    logging.warning(
+                        f"Skipping image {url}: {content_length} bytes exceeds the {max_bytes} bytes limit."
+                    )
+                    return None
+
+                async with image_memory_budget.reserve(max_bytes):
+                    chunks = []
+                    received = 0
+                    async for chunk in response.aiter_content():
+                        received += len(chunk)
+                        if received > max_bytes:
+                            logging.warning(
+                                f"Skipping image {url}: body exceeds the {max_bytes} bytes limit."
+                            )
+                            return None
+                        chunks.append(chunk)
+                    return b"".join(chunks)
+            finally:
+                await response.aclose()
     except Exception as e:
         logging.error(f"Error downloading image bytes from {url}: {e}")
         return None
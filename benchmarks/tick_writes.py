@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import make_url, text  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.core.database import create_db_engine  # noqa: E402
+from app.core.db_queries import (  # noqa: E402
+    add_new_ads,
+    create_subscription,
+    get_or_create_user,
+    update_search_last_checked,
+)
+from app.core.models import Base  # noqa: E402
+from app.utils.hash import get_search_hash  # noqa: E402
+
+DEFAULT_URLS = ["sqlite+aiosqlite://"]
+
+
+@asynccontextmanager
+async def throwaway_database(url: str):
+    if url.startswith("sqlite"):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tick_writes.sqlite3")
+            yield make_url(url).set(database=path).render_as_string(hide_password=False)
+        return
+
+    name = f"tick_writes_benchmark_{os.getpid()}"
+    admin_engine = create_async_engine(url, isolation_level="AUTOCOMMIT")
+    try:
+        async with admin_engine.connect() as conn:
+            await conn.execute(text(f'CREATE DATABASE "{name}"'))
+        try:
+            yield make_url(url).set(database=name).render_as_string(hide_password=False)
+        finally:
+            async with admin_engine.connect() as conn:
+                await conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+    finally:
+        await admin_engine.dispose()
+
+
+def build_ads(tick: int, search_index: int, count: int) -> list[dict]:
+    published_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+    return [
+        {
+            "url": f"https://cars.av.by/bench/{tick}/{search_index}/{ad_index}",
+            "ad_id": f"{tick}-{search_index}-{ad_index}",
+            "platform": "av",
+            "published_at": published_at,
+            "data": {
+                "title": f"Benchmark car {ad_index}",
+                "price_usd": 10000 + ad_index,
+                "price_byn": 32000 + ad_index,
+                "params": "2015 г., автомат, 2.0 л, бензин, 150 000 км",
+                "description": "Benchmark description " * 10,
+                "images": [f"https://example.com/{ad_index}.jpg"],
+            },
+        }
+        for ad_index in range(count)
+    ]
+
+
+async def seed(session_maker: async_sessionmaker, searches: int, subscribers: int):
+    hashes = []
+    async with session_maker() as session:
+        for user_id in range(1, subscribers + 1):
+            await get_or_create_user(session, user_id, None, None)
+        for search_index in range(searches):
+            params = {"brand_id": search_index}
+            for user_id in range(1, subscribers + 1):
+                await create_subscription(session, user_id, "av", params)
+            hashes.append(get_search_hash("av", params))
+    return hashes
+
+
+async def run_tick(
+    session_maker: async_sessionmaker,
+    hashes: list[str],
+    tick: int,
+    ads_per_search: int,
+    workers: int,
+):
+    queue = asyncio.Queue()
+    for search_index, search_hash in enumerate(hashes):
+        queue.put_nowait((search_index, search_hash))
+
+    async def worker():
+        async with session_maker() as session:
+            while not queue.empty():
+                search_index, search_hash = queue.get_nowait()
+                ads = build_ads(tick, search_index, ads_per_search)
+                await add_new_ads(session, search_hash, ads)
+                await update_search_last_checked(session, search_hash)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+async def benchmark(url: str, args) -> dict | None:
+    try:
+        async with throwaway_database(url) as benchmark_url:
+            return await run_benchmark(url, benchmark_url, args)
+    except OSError as e:
+        print(f"{url}: skipped, database is not reachable ({e})")
+        return None
+
+
+async def run_benchmark(url: str, benchmark_url: str, args) -> dict:
+    engine = create_db_engine(benchmark_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    hashes = await seed(session_maker, args.searches, args.subscribers)
+
+    durations = []
+    for tick in range(args.ticks):
+        started_at = time.perf_counter()
+        await run_tick(session_maker, hashes, tick, args.ads_per_search, args.workers)
+        durations.append(time.perf_counter() - started_at)
+
+    await engine.dispose()
+
+    ads_per_tick = args.searches * args.ads_per_search
+    average = sum(durations) / len(durations)
+    return {
+        "url": url,
+        "avg_tick_seconds": average,
+        "max_tick_seconds": max(durations),
+        "ads_per_second": ads_per_tick / average,
+        "outbox_rows_per_second": ads_per_tick * args.subscribers / average,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Compare tick write throughput of the supported storage backends. "
+        "Each run uses a throwaway database: a temporary SQLite file, or a database "
+        "created and dropped on the PostgreSQL server given with --url."
+    )
+    parser.add_argument("--url", action="append", dest="urls")
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--subscribers", type=int, default=3)
+    parser.add_argument("--ads-per-search", type=int, default=10)
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    for url in args.urls or DEFAULT_URLS:
+        result = await benchmark(url, args)
+        if result:
+            print(
+                "{url}: avg tick {avg_tick_seconds:.2f}s, max tick {max_tick_seconds:.2f}s, "
+                "{ads_per_second:.0f} ads/s, {outbox_rows_per_second:.0f} outbox rows/s".format(
+                    **result
+                )
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
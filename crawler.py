@@ -0,0 +1,61 @@
+import asyncio
+import logging
+import sys
+from datetime import datetime, timezone
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.database import create_db_engine, create_schema
+from app.core.settings import settings
+from app.services.currency_converter import CurrencyConverter
+from app.services.proxy_pool import check_proxy_health
+from app.services.tick_controller import TickController, get_worker_id
+
+
+async def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        stream=sys.stdout,
+        format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+    )
+
+    crawler_start_time = datetime.now(timezone.utc)
+
+    await CurrencyConverter.get_usd_rate()
+
+    engine = create_db_engine()
+    await create_schema(engine)
+
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    scheduler = AsyncIOScheduler(timezone="Europe/Minsk")
+    scheduler.add_job(
+        check_proxy_health,
+        "interval",
+        seconds=settings.proxy_health_check_interval_seconds,
+    )
+    scheduler.start()
+
+    worker_id = get_worker_id("crawler")
+    tick_controller = TickController(
+        session_maker=session_maker,
+        bot_start_time=crawler_start_time,
+        worker_id=worker_id,
+    )
+    tick_controller.start()
+    logging.info(f"Crawler worker {worker_id} started.")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await tick_controller.stop()
+        scheduler.shutdown(wait=False)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, SystemExit):
+        logging.info("Crawler stopped.")
@@ -1,23 +1,107 @@
 import asyncio
 import logging
+import os
 import sys
+import time
 from datetime import datetime, timezone
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
-from app.bot.handlers import analyse_handler, common, new_search
+from app.bot.handlers import ad_actions, analyse_handler, common, new_search
 from app.bot.middlewares.db import DbSessionMiddleware
+from app.bot.storage import DbStorage
 from app.bot.utils.commands import set_bot_commands
-from app.core.database import get_db_url
-from app.core.models import Base
+from app.bot.utils.webhook import run_webhook
+from app.core.database import (
+    create_db_engine,
+    start_schema_init,
+    wait_for_schema,
+)
 from app.core.settings import settings
+from app.services.catalog import BrandCatalog
 from app.services.currency_converter import CurrencyConverter
+from app.services.gemini_client import import_generativelanguage
+from app.services.proxy_pool import check_proxy_health
 from app.services.scheduler import setup_scheduler
+from app.services.tick_controller import TickController, get_worker_id
+
+
+def get_process_uptime() -> float:
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            system_uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return 0.0
+    return max(system_uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 0.0)
+
+
+def make_startup_logger(launched_at: float, main_started_at: float):
+    async def log_startup_time():
+        logging.info(
+            f"STARTUP: Ready for updates {time.perf_counter() - launched_at:.2f}s after launch "
+            f"(imports took {main_started_at - launched_at:.2f}s)."
+        )
+
+    return log_startup_time
+
+
+async def warm_gemini():
+    if settings.gemini_api_key:
+        await asyncio.to_thread(import_generativelanguage)
+
+
+async def warm_up(
+    bot: Bot,
+    session_maker: async_sessionmaker,
+    bot_start_time: datetime,
+    launched_at: float,
+):
+    started_at = time.perf_counter()
+    await wait_for_schema()
+
+    await BrandCatalog.load(session_maker)
+    if BrandCatalog.is_stale():
+        BrandCatalog.refresh_in_background()
+
+    scheduler = await setup_scheduler(
+        bot=bot, session_maker=session_maker, bot_start_time=bot_start_time
+    )
+    scheduler.start()
+
+    tick_controller = None
+    if settings.embedded_crawler:
+        tick_controller = TickController(
+            session_maker=session_maker,
+            bot_start_time=bot_start_time,
+            worker_id=get_worker_id("bot"),
+        )
+        tick_controller.start()
+
+    results = await asyncio.gather(
+        CurrencyConverter.get_usd_rate(),
+        check_proxy_health(),
+        set_bot_commands(bot),
+        warm_gemini(),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logging.error(f"STARTUP: Warm-up step failed. Error: {result}")
+    logging.info(
+        f"STARTUP: Warm-up finished in {time.perf_counter() - started_at:.2f}s "
+        f"({time.perf_counter() - launched_at:.2f}s after launch)."
+    )
+    return scheduler, tick_controller
 
 
 async def main():
+    main_started_at = time.perf_counter()
+    launched_at = main_started_at - get_process_uptime()
+
     logging.basicConfig(
         level=logging.INFO,
         stream=sys.stdout,
@@ -26,33 +110,32 @@ async def main():
 
     bot_start_time = datetime.now(timezone.utc)
 
-    await CurrencyConverter.get_usd_rate()
-
-    engine = create_async_engine(get_db_url(), echo=False)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    engine = create_db_engine()
+    start_schema_init(engine)
 
     session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
     bot = Bot(token=settings.bot_token, default=DefaultBotProperties(parse_mode="HTML"))
-    dp = Dispatcher()
+    dp = Dispatcher(storage=DbStorage(session_maker))
 
     dp.update.outer_middleware(DbSessionMiddleware(session_maker=session_maker))
 
     dp.include_router(common.router)
     dp.include_router(new_search.router)
     dp.include_router(analyse_handler.router)
+    dp.include_router(ad_actions.router)
 
-    scheduler = await setup_scheduler(
-        bot=bot, session_maker=session_maker, bot_start_time=bot_start_time
-    )
-    scheduler.start()
-
-    await bot.delete_webhook(drop_pending_updates=True)
+    dp.startup.register(make_startup_logger(launched_at, main_started_at))
 
-    await set_bot_commands(bot)
+    warm_up_task = asyncio.create_task(
+        warm_up(bot, session_maker, bot_start_time, launched_at)
+    )
 
-    await dp.start_polling(bot)
+    if settings.bot_mode == "webhook":
+        await asyncio.gather(run_webhook(dp, bot), warm_up_task)
+    else:
+        await bot.delete_webhook(drop_pending_updates=True)
+        await asyncio.gather(dp.start_polling(bot), warm_up_task)
 
 
 if __name__ == "__main__":